@@ -0,0 +1,174 @@
+"""Batch scoring CLI with bounded-memory pipelined stages.
+
+    reader thread --(bounded queue)--> worker pool --(bounded in-flight window)--> writer
+
+The reader streams fixed-size batches with load.iter_batches. Every worker
+process loads the model, the fitted vectorizers and a Preprocessor once, builds
+the paragraph/sentence/word features (Feature_plan), the Preprocessor features
+and the sparse TF-IDF blocks for its batch and predicts. The writer appends the
+scores to a CSV or Parquet file in input order. At most `prefetch` batches wait in
+the queue and 2 * workers batches are in flight, so peak memory does not grow
+with the input size. With --profile the workers' stage
+stats are merged into the parent and written as JSON.
+
+Usage:
+    python Batch_inference.py --input data/test.csv --output submission.csv --workers 32
+    python Batch_inference.py --input data/test.csv --profile stages.json
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifacts import ARTIFACTS, load_artifact, load_model
+from Feature_plan import Generate_text_features
+from Hashing_vectorizer import bounded_map
+from Instrumentation import drain, enable, init_worker, merge, to_json, worker_settings
+from load import PATHS, iter_batches
+from Preprocessor import Preprocessor
+from qwk import QWK_A, to_scores
+from Sparse_features import assemble_sparse_features
+from Vectorization import Generate_tfidf_sparse
+from Word_vectorizer import generate_tfidf_sparse_with_stopwords
+
+# Model, vectorizers and Preprocessor loaded once in every worker process by _init_worker
+_WORKER = None
+
+def _init_worker(model_path, tfidf_path, word_tfidf_path, profile=(False, False)):
+    global _WORKER
+    init_worker(profile)
+    model = load_model(model_path)
+    _WORKER = {
+        'booster': getattr(model, 'booster_', model),
+        'vectorizer': load_artifact(tfidf_path),
+        'word_vectorizer': load_artifact(word_tfidf_path),
+        'preprocessor': Preprocessor(),
+    }
+
+def assemble_model_features(feats, blocks, model_names):
+    """CSR matrix of a batch with exactly the model's columns, in the model's order.
+
+    Dense columns the model knows but the batch lacks are added as NaN by the
+    reindex, so the assembled columns only need a CSR column selection.
+    """
+    block_columns = {name for block in blocks for name in block.columns}
+    dense = feats.reindex(columns=['essay_id'] + [name for name in model_names if name not in block_columns])
+    X, names = assemble_sparse_features(dense, blocks)
+    if names == list(model_names):
+        return X
+    position = {name: i for i, name in enumerate(names)}
+    return X[:, [position[name] for name in model_names]]
+
+def score_batch(batch):
+    """Features + prediction for one Polars batch of essays; runs inside a worker."""
+    w = _WORKER
+    # Generate_text_features sorts by essay_id; keep the rows in the batch's order
+    feats = batch.select('essay_id').join(Generate_text_features(batch), on='essay_id', how='left',
+                                          maintain_order='left').to_pandas()
+    pre = w['preprocessor'].run(batch.select('essay_id', 'full_text').to_pandas(), mode='test', verbose=False)
+    pre = pre.drop(columns=['full_text', 'processed_text', 'text_tokens'])
+    feats = feats.merge(pre, on='essay_id', how='left')
+    blocks = [
+        Generate_tfidf_sparse(batch, vectorizer=w['vectorizer']),
+        generate_tfidf_sparse_with_stopwords(batch, word_vectorizer=w['word_vectorizer']),
+    ]
+    X = assemble_model_features(feats, blocks, w['booster'].feature_name())
+    pred = w['booster'].predict(X)
+    return pd.DataFrame({'essay_id': feats['essay_id'], 'score': to_scores(pred, QWK_A).astype('int32')})
+
+def _score_task(batch):
+    # The worker's stage stats go back with the scores; run() merges them
+    return score_batch(batch), drain()
+
+def prefetch(iterable, maxsize):
+    """Run the producer in a thread and hand its items over through a bounded queue."""
+    items = queue.Queue(maxsize)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put(item)
+        finally:
+            items.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while (item := items.get()) is not done:
+        yield item
+
+class ScoreWriter:
+    """Appends score frames to a CSV (with a single header) or a Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.writer = None
+        if not self.parquet and os.path.exists(path):
+            os.remove(path)
+
+    def write(self, scores):
+        if self.parquet:
+            table = pa.Table.from_pandas(scores, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            scores.to_csv(self.path, mode='a', header=self.writer is None, index=False)
+            self.writer = True
+
+    def close(self):
+        if self.parquet and self.writer is not None:
+            self.writer.close()
+
+def run(input_path, output_path, batch_size=10_000, workers=os.cpu_count(), prefetch_batches=4,
+        model_path=ARTIFACTS.model_path, tfidf_path=ARTIFACTS.tfidf_path, word_tfidf_path=ARTIFACTS.word_tfidf_path):
+    """Score every essay of input_path and write essay_id, score to output_path.
+
+    Returns:
+        int: Number of essays scored
+    """
+    batches = prefetch(iter_batches(input_path, batch_size, columns=['essay_id', 'full_text']), prefetch_batches)
+    writer = ScoreWriter(output_path)
+    n_scored = 0
+    try:
+        # Spawned, not forked: forking after Polars has started its thread pool can deadlock
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+                                 initargs=(model_path, tfidf_path, word_tfidf_path, worker_settings())) as executor:
+            for scores, stats in bounded_map(executor, _score_task, batches, 2 * workers):
+                merge(stats)
+                writer.write(scores)
+                n_scored += len(scores)
+    finally:
+        writer.close()
+    return n_scored
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score essays in bounded-memory batches.')
+    parser.add_argument('--input', default=PATHS.test_path, help='CSV, Parquet or Arrow IPC file with essay_id, full_text')
+    parser.add_argument('--output', default='submission.csv', help='.csv or .parquet')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--prefetch', type=int, default=4, help='batches read ahead of the workers')
+    parser.add_argument('--model', default=ARTIFACTS.model_path)
+    parser.add_argument('--tfidf', default=ARTIFACTS.tfidf_path)
+    parser.add_argument('--word-tfidf', default=ARTIFACTS.word_tfidf_path)
+    parser.add_argument('--profile', help='write the per-stage stats of all workers as JSON to this path')
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        enable()
+    n_scored = run(args.input, args.output, args.batch_size, args.workers, args.prefetch,
+                   args.model, args.tfidf, args.word_tfidf)
+    print(f"Scored {n_scored} essays -> {args.output}")
+    if args.profile:
+        to_json(args.profile)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Benchmarks of the feature pipeline on synthetic essays.
+
+Every case times one public stage (the feature_engineering normalizers,
+Paragraph_Eng, Sentence_Eng, Preprocessor.run, both TF-IDF builders and model
+prediction) on load_essays(n) for each requested size. Each (case, size) runs in
+fresh spawned processes, so its peak RSS is not inflated by the cases before it.
+Timings differ more between processes (hash seed, memory layout) than between
+repeated calls in one process, so every case runs in several processes and the
+best time over all of them is kept.
+Results are written as JSON and can be compared against a saved baseline; the
+exit status is 1 when a case got slower or larger than the tolerance allows. A
+baseline recorded with different settings or library versions (its 'meta') is
+refused with exit status 2 unless --ignore-meta is given.
+
+Usage:
+    python Benchmark.py --sizes 1000 10000 --output bench.json
+    python Benchmark.py --sizes 1000 10000 --baseline bench.json      # gate on regressions
+    python Benchmark.py --sizes 1000000 --cases paragraph sentence --repeat 1 --processes 1
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import polars as pl
+
+from Synthetic_essays import load_essays
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _normalizer(func_name):
+    def prepare(essays):
+        import feature_engineering
+        func = getattr(feature_engineering, func_name)
+        texts = essays['full_text'].to_list()
+        return lambda: [func(text) for text in texts]
+    return prepare
+
+
+def _paragraph(essays):
+    from Paragraph_engineering import Paragraph_Eng, Paragraph_Preprocess
+    tmp = essays.with_columns(pl.col('full_text').str.split(by='\n\n').alias('paragraph'))
+    return lambda: Paragraph_Eng(Paragraph_Preprocess(tmp))
+
+
+def _sentence(essays):
+    from Sentence_engineering import Sentence_Eng, Sentence_Preprocess
+    tmp = essays.with_columns(pl.col('full_text').str.split(by='.').alias('sentence'))
+    return lambda: Sentence_Eng(Sentence_Preprocess(tmp))
+
+
+def _preprocessor(essays):
+    from Preprocessor import Preprocessor
+    preprocessor = Preprocessor()
+    data = essays.select('essay_id', 'full_text').to_pandas()
+    return lambda: preprocessor.run(data.copy(), mode='test', verbose=False)
+
+
+def _tfidf(essays):
+    from Vectorization import Generate_tfidf_sparse
+    return lambda: Generate_tfidf_sparse(essays)
+
+
+def _tfidf_words(essays):
+    from Word_vectorizer import generate_tfidf_sparse_with_stopwords
+    return lambda: generate_tfidf_sparse_with_stopwords(essays)
+
+
+def _predict(essays):
+    from artifacts import ARTIFACTS, load_model
+    model = load_model(ARTIFACTS.model_path)
+    booster = getattr(model, 'booster_', model)
+    # Prediction time depends on the trees and the row count, not on the feature values
+    X = np.random.default_rng(0).random((essays.height, booster.num_feature()), dtype=np.float32)
+    return lambda: booster.predict(X)
+
+
+# Case name -> prepare(essays), which does the untimed setup and returns the timed call
+CASES = {
+    'dataPreprocessing': _normalizer('dataPreprocessing'),
+    'dataPreprocessing_w_contract': _normalizer('dataPreprocessing_w_contract'),
+    'dataPreprocessing_w_punct_remove': _normalizer('dataPreprocessing_w_punct_remove'),
+    'dataPreprocessing_w_contract_punct_remove': _normalizer('dataPreprocessing_w_contract_punct_remove'),
+    'paragraph': _paragraph,
+    'sentence': _sentence,
+    'preprocessor': _preprocessor,
+    'tfidf': _tfidf,
+    'tfidf_words': _tfidf_words,
+    'predict': _predict,
+}
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def run_case(name, n, seed=0, repeat=3):
+    """Time one case on n essays in the current process.
+
+    Returns:
+        dict: every, best and mean seconds, essays per second, peak RSS and its growth during the timed calls
+    """
+    call = CASES[name](load_essays(n, seed))
+    gc.collect()
+    rss = _peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'n': n,
+        'times': times,
+        'seconds': best,
+        'mean_seconds': sum(times) / len(times),
+        'essays_per_second': n / best if best > 0 else float('inf'),
+        'peak_rss_bytes': _peak_rss(),
+        'rss_growth_bytes': _peak_rss() - rss,
+    }
+
+
+def _best_of(runs):
+    # Best time over the processes; 'process_seconds' keeps the best time of each process
+    best = min(runs, key=lambda r: r['seconds'])
+    times = [t for r in runs for t in r['times']]
+    return {
+        **best,
+        'times': times,
+        'process_seconds': [r['seconds'] for r in runs],
+        'mean_seconds': sum(times) / len(times),
+        'peak_rss_bytes': max(r['peak_rss_bytes'] for r in runs),
+        'rss_growth_bytes': min(r['rss_growth_bytes'] for r in runs),
+    }
+
+
+def run(cases=tuple(CASES), sizes=SIZES[:2], seed=0, repeat=3, processes=3):
+    """Run every (case, size) in `processes` spawned processes, one after another.
+
+    Returns:
+        dict: 'meta' (versions, machine) and 'results' keyed by '<case>@<n>'
+    """
+    for n in sizes:
+        # Generate and cache the essays once, before the workers read them
+        load_essays(n, seed)
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for n in sizes:
+        for name in cases:
+            runs = []
+            for _ in range(processes):
+                with ProcessPoolExecutor(1, mp_context=context) as executor:
+                    runs.append(executor.submit(run_case, name, n, seed, repeat).result())
+            results[f'{name}@{n}'] = result = _best_of(runs)
+            print(f"{name:<44}{n:>9}  {result['seconds']:9.3f}s  {result['essays_per_second']:12.0f}/s"
+                  f"  {result['rss_growth_bytes'] / 2**20:9.1f} MiB")
+    return {'meta': _meta(seed, repeat, processes), 'results': results}
+
+
+def _meta(seed, repeat, processes):
+    import lightgbm
+    import sklearn
+    return {
+        'seed': seed,
+        'repeat': repeat,
+        'processes': processes,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'polars': pl.__version__,
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'lightgbm': lightgbm.__version__,
+    }
+
+
+def meta_mismatch(results, baseline):
+    """(key, baseline value, current value) of every meta entry that differs between two run() outputs."""
+    current, before = results['meta'], baseline.get('meta', {})
+    return [(key, before.get(key), current.get(key)) for key in sorted(set(current) | set(before))
+            if current.get(key) != before.get(key)]
+
+
+def _time_noise(result):
+    # Spread of the best times of the processes of one run
+    times = result.get('process_seconds') or [result['seconds']]
+    return max(times) - min(times)
+
+
+def compare(results, baseline, time_tolerance=0.15, memory_tolerance=0.15, time_floor=0.1):
+    """Cases that are slower or use more memory than the baseline beyond the tolerances.
+
+    The best time is a regression only when its increase exceeds both
+    time_tolerance and a noise floor: time_floor seconds, or the spread of the
+    per-process best times of either run if that is larger. RSS growth below
+    1 MiB is treated as noise.
+
+    Args:
+        results (dict): Output of run().
+        baseline (dict): An earlier output of run(), with the same meta (see meta_mismatch).
+        time_tolerance (float): Allowed relative increase of the best time.
+        memory_tolerance (float): Allowed relative increase of the RSS growth.
+        time_floor (float): Smallest increase of the best time, in seconds, that counts.
+
+    Returns:
+        list: (case, metric, baseline value, current value) of every regression
+    """
+    regressions = []
+    for case, current in results['results'].items():
+        before = baseline['results'].get(case)
+        if before is None:
+            continue
+        noise = max(time_floor, _time_noise(before), _time_noise(current))
+        if current['seconds'] - before['seconds'] > max(before['seconds'] * time_tolerance, noise):
+            regressions.append((case, 'seconds', before['seconds'], current['seconds']))
+        if current['rss_growth_bytes'] > max(before['rss_growth_bytes'], 2**20) * (1 + memory_tolerance):
+            regressions.append((case, 'rss_growth_bytes', before['rss_growth_bytes'], current['rss_growth_bytes']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES[:2]))
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Timed calls per process')
+    parser.add_argument('--processes', type=int, default=3, help='Fresh processes per case')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this earlier --output file')
+    parser.add_argument('--time-tolerance', type=float, default=0.15)
+    parser.add_argument('--memory-tolerance', type=float, default=0.15)
+    parser.add_argument('--time-floor', type=float, default=0.1, help='Seconds of slowdown that are always noise')
+    parser.add_argument('--ignore-meta', action='store_true',
+                        help='Compare even if the baseline was run with other settings or versions')
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.sizes, args.seed, args.repeat, args.processes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = meta_mismatch(results, baseline)
+        for key, before, after in mismatch:
+            print(f"{'WARNING' if args.ignore_meta else 'ERROR'} baseline {key}: {before} -> {after}")
+        if mismatch and not args.ignore_meta:
+            print("Baseline was run with other settings; not comparing (use --ignore-meta to compare anyway)")
+            return 2
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance, args.time_floor)
+        for case, metric, before, after in regressions:
+            change = f"{after / before - 1:+.1%}" if before else 'new'
+            print(f"REGRESSION {case} {metric}: {before:.4g} -> {after:.4g} ({change})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
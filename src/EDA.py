@@ -1,7 +1,27 @@
+"""Exploratory plots of the engineered features.
+
+Every plot is drawn from small pre-aggregated data instead of the raw rows:
+- binned histogram counts
+- box plot statistics, with a sample of the fliers
+- the correlation matrix
+- a random sample of at most max_points rows for the scatter plots
+Plotting cost therefore does not grow with the number of essays.
+The plot functions save a PNG and only call plt.show() when show=True and the
+backend is interactive. generate_report renders all plots headless (Agg) in
+worker processes and bundles them into one self-contained HTML file.
+"""
+
+import base64
+import io
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
-import time
 
 feats = [
     "text_length","text_length_p","text_length_pc","text_length_ppr","text_length_pcpr",
@@ -10,50 +30,225 @@ feats = [
     "splling_err_num","splling_err_num_p","splling_err_num_pc","splling_err_num_ppr","splling_err_num_pcpr"
 ]
 
-def Histogram_plot(train):
-    os.makedirs("plots", exist_ok=True)
-    sns.set(rc={'figure.figsize': (15, 15)})
-
-    train[feats + ["score"]].hist(bins=50)
-    plt.savefig("plots/Histogram_plot.png")
-    plt.show()
-    time.sleep(2.0)
-    plt.close()
-
-def Boxplot(data, features, num_features_per_plot=5):
-    num_plots = (len(features) + num_features_per_plot - 1) // num_features_per_plot  # Calculate the number of plots needed
-    for i in range(num_plots):
-        start_idx = i * num_features_per_plot
-        end_idx = (i + 1) * num_features_per_plot
-        plt.figure(figsize=(12, 2))
-        sns.boxplot(data=data[features[start_idx:end_idx]], orient="h")
-        plt.title(f'Boxplot {i+1}')
-        plt.savefig(f"plots/Boxplot_{i}.png")
+PLOTS_PER_FIGURE = 5
+
+
+def _column(data, name):
+    # Finite float values of one column of a pandas or Polars frame
+    values = np.asarray(data[name], dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+def histogram_counts(data, features, bins=50):
+    """(counts, edges) of every feature, like DataFrame.hist(bins=bins) but without keeping the rows."""
+    hists = {}
+    for name in features:
+        values = _column(data, name)
+        hists[name] = np.histogram(values, bins=bins) if len(values) else (np.zeros(bins), np.linspace(0, 1, bins + 1))
+    return hists
+
+
+def box_stats(data, features, max_fliers=200, seed=0):
+    """Box plot statistics of every feature for Axes.bxp (1.5 IQR whiskers, at most max_fliers fliers)."""
+    rng = np.random.default_rng(seed)
+    stats = []
+    for name in features:
+        values = _column(data, name)
+        if not len(values):
+            continue
+        q1, med, q3 = np.percentile(values, [25, 50, 75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        inside = values[(values >= low) & (values <= high)]
+        fliers = values[(values < low) | (values > high)]
+        if len(fliers) > max_fliers:
+            # Keep the extremes so the axis range matches the full data
+            fliers = np.concatenate([[fliers.min(), fliers.max()], rng.choice(fliers, max_fliers - 2, replace=False)])
+        stats.append({
+            'label': name, 'med': med, 'q1': q1, 'q3': q3, 'fliers': fliers,
+            'whislo': inside.min() if len(inside) else q1, 'whishi': inside.max() if len(inside) else q3,
+        })
+    return stats
+
+
+def correlation_matrix(data, columns):
+    """Pearson correlation of columns as a DataFrame, like DataFrame.corr()."""
+    if hasattr(data, 'to_pandas'):
+        data = data.select(columns).to_pandas()
+    values = data[columns].to_numpy(dtype=np.float64)
+    if not np.isfinite(values).all():
+        # Pairwise-complete correlation only matters with missing values
+        return data[columns].corr()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.corrcoef(values, rowvar=False)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def sample_rows(data, columns, max_points=20_000, seed=0):
+    """At most max_points random rows of columns, as a dict of arrays."""
+    n = len(data)
+    rows = np.sort(np.random.default_rng(seed).choice(n, max_points, replace=False)) if n > max_points else slice(None)
+    return {name: np.asarray(data[name], dtype=np.float64)[rows] for name in columns}
+
+
+def _chunks(items, size=PLOTS_PER_FIGURE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _render_histograms(hists):
+    n_cols = 5
+    n_rows = (len(hists) + n_cols - 1) // n_cols
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, 3 * n_rows), squeeze=False)
+    for ax, (name, (counts, edges)) in zip(axes.flat, hists.items()):
+        ax.stairs(counts, edges, fill=True)
+        ax.set_title(name)
+    for ax in axes.flat[len(hists):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+def _render_boxplot(stats, title):
+    fig, ax = plt.subplots(figsize=(12, 2))
+    ax.bxp(stats, orientation='horizontal', showfliers=True)
+    ax.set_title(title)
+    return fig
+
+
+def _render_correlation(corr):
+    fig, ax = plt.subplots(figsize=(20, 20))
+    sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f", linewidths=0.2, ax=ax)
+    ax.set_title('Correlation Matrix')
+    return fig
+
+
+def _render_scatter(sample, columns):
+    fig, axes = plt.subplots(1, PLOTS_PER_FIGURE, figsize=(25, 6))
+    for ax, name in zip(axes, columns):
+        ax.scatter(sample[name], sample['score'], s=6, alpha=0.3, color='steelblue')
+        ax.set_xlabel(name)
+        ax.set_ylabel('score')
+        ax.set_title(name)
+    for ax in axes[len(columns):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+_RENDERERS = {
+    'histogram': _render_histograms,
+    'boxplot': _render_boxplot,
+    'correlation': _render_correlation,
+    'scatter': _render_scatter,
+}
+
+
+def _save(fig, path, show):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fig.savefig(path)
+    if show and matplotlib.get_backend().lower() not in ('agg', 'pdf', 'ps', 'svg', 'cairo', 'template'):
         plt.show()
-        time.sleep(2.0)
-        plt.close()
-        
-def Coorelation_plot(data):
-    correlation_matrix = data[["score"]+feats].corr()
-    plt.figure(figsize=(20, 20))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt=".2f", linewidths=0.2)
-    plt.title('Correlation Matrix')
-    plt.savefig("plots/Correlation_plot.png")
-    plt.show()
-    time.sleep(2.0)
-    plt.close()
-    
-def Scatter_subplots(train_feats, feats):
-    os.makedirs("plots", exist_ok=True)  
-    for col_idx in range(0, len(feats), 5):
-        fig, axes = plt.subplots(1, 5, figsize=(25, 6))
-        for i in range(0, 5):
-            if col_idx + i < len(feats):
-                sns.scatterplot(ax=axes[i], data=train_feats, x=feats[col_idx + i], y='score', color='steelblue')
-                axes[i].set_title(feats[col_idx + i])  
-        plt.tight_layout()  
-        plt.savefig(f"plots/Scatter_Sub-plot_{col_idx}.png")  # Save the entire figure
-        plt.close(fig)
-    plt.show()
-    time.sleep(2.0)
-    plt.close()
+    plt.close(fig)
+
+
+def Histogram_plot(train, bins=50, show=True):
+    _save(_render_histograms(histogram_counts(train, feats + ["score"], bins)), "plots/Histogram_plot.png", show)
+
+
+def Boxplot(data, features, num_features_per_plot=5, show=True):
+    stats = box_stats(data, features)
+    for i, start_idx in enumerate(range(0, len(stats), num_features_per_plot)):
+        fig = _render_boxplot(stats[start_idx:start_idx + num_features_per_plot], f'Boxplot {i+1}')
+        _save(fig, f"plots/Boxplot_{i}.png", show)
+
+
+def Coorelation_plot(data, show=True):
+    _save(_render_correlation(correlation_matrix(data, ["score"] + feats)), "plots/Correlation_plot.png", show)
+
+
+def Scatter_subplots(train_feats, feats, max_points=20_000, show=True):
+    sample = sample_rows(train_feats, list(feats) + ['score'], max_points)
+    for col_idx in range(0, len(feats), PLOTS_PER_FIGURE):
+        fig = _render_scatter(sample, feats[col_idx:col_idx + PLOTS_PER_FIGURE])
+        _save(fig, f"plots/Scatter_Sub-plot_{col_idx}.png", show)
+
+
+def _init_worker():
+    plt.switch_backend('Agg')
+
+
+def _render_png(task):
+    # Runs in a worker: draw one figure from its pre-aggregated data and return the PNG bytes
+    name, kind, args = task
+    fig = _RENDERERS[kind](*args)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=80)
+    plt.close(fig)
+    return name, buffer.getvalue()
+
+
+def report_tasks(data, features=feats, bins=50, max_points=20_000):
+    """Pre-aggregate data into one small render task per figure: (name, kind, args)."""
+    features = [name for name in features if name in data.columns]
+    hists = histogram_counts(data, features + ['score'], bins)
+    stats = box_stats(data, features)
+    sample = sample_rows(data, features + ['score'], max_points)
+    tasks = [(f'Histogram_plot_{i}', 'histogram', ({name: hists[name] for name in chunk},))
+             for i, chunk in enumerate(_chunks(features + ['score']))]
+    tasks += [(f'Boxplot_{i}', 'boxplot', (chunk, f'Boxplot {i+1}')) for i, chunk in enumerate(_chunks(stats))]
+    tasks.append(('Correlation_plot', 'correlation', (correlation_matrix(data, ['score'] + features),)))
+    tasks += [(f'Scatter_Sub-plot_{i * PLOTS_PER_FIGURE}', 'scatter', ({name: sample[name] for name in chunk + ['score']}, chunk))
+              for i, chunk in enumerate(_chunks(features))]
+    return tasks
+
+
+def generate_report(data, out_dir='plots', features=feats, workers=os.cpu_count(), bins=50, max_points=20_000,
+                    html='eda_report.html'):
+    """Render every EDA plot headless and bundle them into one HTML file.
+
+    Args:
+        data (_type_): pandas or Polars frame with the features and 'score'.
+        out_dir (str): Directory of the PNG files and the HTML bundle.
+        features (list): Features to plot; missing ones are skipped.
+        workers (int): Render processes, at most one per CPU; 1 renders in this process.
+        bins (int): Histogram bins.
+        max_points (int): Rows sampled for the scatter plots.
+        html (str): File name of the HTML bundle in out_dir, None to only write the PNGs.
+
+    Returns:
+        str: Path of the HTML bundle (or out_dir)
+    """
+    tasks = report_tasks(data, features, bins, max_points)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers or 1, os.cpu_count() or 1, len(tasks)))
+    if workers == 1:
+        # Starting a worker costs more than rendering on one core
+        backend = matplotlib.get_backend()
+        _init_worker()
+        try:
+            pngs = [_render_png(task) for task in tasks]
+        finally:
+            plt.switch_backend(backend)
+    else:
+        # Spawned workers start with the Agg backend and no copy of the data
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as executor:
+            pngs = list(executor.map(_render_png, tasks))
+    for name, png in pngs:
+        with open(os.path.join(out_dir, f'{name}.png'), 'wb') as f:
+            f.write(png)
+    if html is None:
+        return out_dir
+    sections = ''.join(
+        f'<h2>{name}</h2>\n<img src="data:image/png;base64,{base64.b64encode(png).decode("ascii")}">\n'
+        for name, png in pngs
+    )
+    path = os.path.join(out_dir, html)
+    with open(path, 'w') as f:
+        f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>EDA report</title></head>\n'
+                f'<body>\n<h1>EDA report ({len(data)} essays)</h1>\n{sections}</body></html>\n')
+    return path
+
+# Example usage
+# Histogram_plot(train_feats)
+# Scatter_subplots(train_feats, feats, max_points=20_000)
+# generate_report(train_feats, out_dir='plots', workers=8)
@@ -0,0 +1,117 @@
+"""Pure-Python features of a single essay, without any DataFrame.
+
+Produces the same values as the Polars path (Paragraph_Preprocess/Paragraph_Eng,
+Sentence_Preprocess/Sentence_Eng, Word_Preprocess/Word_Eng and Preprocessor.run)
+for one essay at a time, which is what a low-latency scorer needs. The statistics
+follow Polars' conventions: 'nearest' quantiles, biased Fisher kurtosis and
+std with ddof=1.
+"""
+
+import math
+from bisect import bisect_left, bisect_right
+
+from nltk.tokenize import word_tokenize
+
+from feature_engineering import dataPreprocessing, dataPreprocessing_w_contract_punct_remove
+from Paragraph_engineering import paragraph_ge, paragraph_le
+from Sentence_engineering import sentence_ge
+from Word_engineering import word_ge
+
+
+def _quantile(ordered, q):
+    # Polars' default 'nearest' interpolation (round half away from zero)
+    return float(ordered[int(math.floor((len(ordered) - 1) * q + 0.5))])
+
+def _kurtosis(values, mean):
+    n = len(values)
+    m2 = sum((v - mean) ** 2 for v in values) / n
+    m4 = sum((v - mean) ** 4 for v in values) / n
+    return m4 / m2 ** 2 - 3 if m2 else math.nan
+
+def _stats(feats, name, values):
+    # max, mean, min, first, last, sum, kurtosis, q1 and q3 as in paragraph_aggs/sentence_aggs
+    ordered = sorted(values)
+    total = sum(values)
+    mean = total / len(values)
+    feats[f'{name}_max'] = ordered[-1]
+    feats[f'{name}_mean'] = mean
+    feats[f'{name}_min'] = ordered[0]
+    feats[f'{name}_first'] = values[0]
+    feats[f'{name}_last'] = values[-1]
+    feats[f'{name}_sum'] = total
+    feats[f'{name}_kurtosis'] = _kurtosis(values, mean)
+    feats[f'{name}_q1'] = _quantile(ordered, 0.25)
+    feats[f'{name}_q3'] = _quantile(ordered, 0.75)
+    return ordered
+
+def paragraph_features(full_text, feats):
+    paragraphs = [dataPreprocessing(p) for p in full_text.split('\n\n')]
+    lengths = [len(p) for p in paragraphs]
+    ordered = _stats(feats, 'paragraph_len', lengths)
+    _stats(feats, 'paragraph_sentence_cnt', [p.count('.') + 1 for p in paragraphs])
+    _stats(feats, 'paragraph_word_cnt', [p.count(' ') + 1 for p in paragraphs])
+    for i in paragraph_ge:
+        feats[f'paragraph_{i}_cnt'] = len(ordered) - bisect_left(ordered, i)
+    for i in paragraph_le:
+        feats[f'paragraph_{i}_cnt'] = bisect_right(ordered, i)
+    return feats
+
+def sentence_features(text_norm, feats):
+    # Sentences shorter than 15 characters are dropped; an essay without any keeps its features missing
+    sentences = [s for s in text_norm.split('.') if len(s) >= 15]
+    if not sentences:
+        return feats
+    ordered = _stats(feats, 'sentence_len', [len(s) for s in sentences])
+    _stats(feats, 'sentence_word_cnt', [s.count(' ') + 1 for s in sentences])
+    for i in sentence_ge:
+        feats[f'sentence_{i}_cnt'] = len(ordered) - bisect_left(ordered, i)
+    return feats
+
+def word_features(text_norm, feats):
+    lengths = [len(w) for w in text_norm.split(' ') if w]
+    if not lengths:
+        return feats
+    ordered = sorted(lengths)
+    n = len(lengths)
+    mean = sum(lengths) / n
+    for i in word_ge:
+        feats[f'word_{i}_cnt'] = n - bisect_left(ordered, i)
+    feats['word_len_max'] = ordered[-1]
+    feats['word_len_mean'] = mean
+    feats['word_len_std'] = math.sqrt(sum((v - mean) ** 2 for v in lengths) / (n - 1)) if n > 1 else math.nan
+    feats['word_len_q1'] = _quantile(ordered, 0.25)
+    feats['word_len_q2'] = _quantile(ordered, 0.50)
+    feats['word_len_q3'] = _quantile(ordered, 0.75)
+    return feats
+
+def preprocessor_features(full_text, processed_text, spell_cache, feats):
+    # Same columns as Preprocessor.run
+    tokens = word_tokenize(processed_text)
+    feats['text_length'] = len(processed_text)
+    feats['word_count'] = len(tokens)
+    feats['unique_word_count'] = len(set(tokens))
+    feats['sentence_count'] = len(full_text.split('.'))
+    feats['paragraph_count'] = len(full_text.split('\n\n'))
+    feats['splling_err_num'] = len(spell_cache.unknown(processed_text.split()))
+    return feats
+
+def essay_features(full_text, spell_cache, processed_text=None):
+    """All handcrafted features of one essay.
+
+    Args:
+        full_text (str): Raw essay text.
+        spell_cache (SpellingCache): Shared spelling cache, e.g. Preprocessor().spell_cache.
+        processed_text (str): dataPreprocessing_w_contract_punct_remove(full_text) if already computed.
+
+    Returns:
+        dict: Feature name -> value. Features that would be null in the Polars path are absent.
+    """
+    if processed_text is None:
+        processed_text = dataPreprocessing_w_contract_punct_remove(full_text)
+    text_norm = dataPreprocessing(full_text)
+    feats = {}
+    paragraph_features(full_text, feats)
+    sentence_features(text_norm, feats)
+    word_features(text_norm, feats)
+    preprocessor_features(full_text, processed_text, spell_cache, feats)
+    return feats
@@ -0,0 +1,222 @@
+"""Column-major float32 feature matrix assembled stage by stage.
+
+The pandas path merges every stage (paragraph, sentence, word, TF-IDF) onto a
+growing float64 frame on essay_id, copying all earlier columns at each merge.
+FeatureMatrix instead preallocates one Fortran-ordered float32 buffer with a row
+per essay. Every stage reserves its own column slice and writes into it in place,
+and a registry maps column names to positions, so the feature list no longer has
+to be recovered by filtering frame columns. LightGBM reads the buffer as is,
+without converting it to float64 or to row-major order.
+"""
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from Feature_plan import Generate_text_features
+from Sparse_features import align_block
+from Vectorization import Generate_tfidf_sparse
+from Word_vectorizer import generate_tfidf_sparse_with_stopwords
+
+
+def _column_kind(column):
+    # 'category', 'number' or None for columns that are not features
+    if isinstance(column, pl.Series):
+        if isinstance(column.dtype, (pl.Categorical, pl.Enum)):
+            return 'category'
+        return 'number' if column.dtype.is_numeric() or column.dtype == pl.Boolean else None
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return 'category'
+    return 'number' if pd.api.types.is_numeric_dtype(column.dtype) else None
+
+
+def _column_values(column, dtype):
+    # One feature column as a NumPy array of dtype, categories as codes and nulls as NaN
+    if isinstance(column, pl.Series):
+        if isinstance(column.dtype, (pl.Categorical, pl.Enum)):
+            column = column.to_physical()
+        return column.cast(pl.Float64).to_numpy().astype(dtype, copy=False)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.cat.codes.where(column.notna())
+    return column.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+class FeatureMatrix:
+    """Preallocated feature buffer with a named column registry.
+
+    Args:
+        essay_id (_type_): Row order of the matrix.
+        capacity (int): Number of columns to allocate up front. The buffer is
+            reallocated (doubling) only if the stages need more.
+        dtype (_type_): dtype of the buffer.
+    """
+
+    def __init__(self, essay_id, capacity=256, dtype=np.float32):
+        self.essay_id = np.asarray(essay_id)
+        self.row_index = pd.Index(self.essay_id)
+        self.dtype = dtype
+        self.data = np.empty((len(self.essay_id), capacity), dtype=dtype, order='F')
+        self.columns = {}
+        self.stages = {}
+        self.categorical = set()
+
+    @property
+    def n_columns(self):
+        return len(self.columns)
+
+    @property
+    def X(self):
+        """View of the filled columns; F-contiguous, so no copy is made."""
+        return self.data[:, :self.n_columns]
+
+    @property
+    def feature_names(self):
+        return list(self.columns)
+
+    @property
+    def categorical_features(self):
+        """Names of the categorical columns, in column order (for LightGBM categorical_feature)."""
+        return [name for name in self.columns if name in self.categorical]
+
+    def __getitem__(self, name):
+        return self.data[:, self.columns[name]]
+
+    def stage(self, name):
+        """View of the column slice written by one stage."""
+        return self.data[:, self.stages[name]]
+
+    def reserve(self, stage, names, categorical=()):
+        """Register the columns of a stage and return its writable slice of the buffer.
+
+        Raises:
+            ValueError: If the stage or one of the column names is already registered.
+        """
+        names = list(names)
+        if stage in self.stages:
+            raise ValueError(f"Stage {stage!r} is already in the matrix")
+        duplicates = [name for name in names if name in self.columns]
+        if duplicates or len(set(names)) != len(names):
+            raise ValueError(f"Duplicate feature columns in stage {stage!r}: {duplicates or names}")
+        start = self.n_columns
+        stop = start + len(names)
+        if stop > self.data.shape[1]:
+            self._grow(stop)
+        self.columns.update((name, start + i) for i, name in enumerate(names))
+        self.categorical.update(categorical)
+        self.stages[stage] = slice(start, stop)
+        return self.data[:, start:stop]
+
+    def _grow(self, n_columns):
+        data = np.empty((self.data.shape[0], max(n_columns, 2 * self.data.shape[1])), dtype=self.dtype, order='F')
+        data[:, :self.n_columns] = self.X
+        self.data = data
+
+    def _rows(self, essay_id):
+        # Matrix row of every incoming row (-1 if unknown), or None when the order already matches
+        essay_id = np.asarray(essay_id)
+        if len(essay_id) == len(self.essay_id) and np.array_equal(essay_id, self.essay_id):
+            return None
+        return self.row_index.get_indexer(essay_id)
+
+    def add_array(self, stage, names, values, essay_id=None, categorical=()):
+        """Write a 2-D array (rows aligned with essay_id, default: the matrix rows) into a new stage.
+
+        Rows of the matrix that are not in essay_id are NaN.
+        """
+        values = np.asarray(values)
+        out = self.reserve(stage, names, categorical)
+        rows = None if essay_id is None else self._rows(essay_id)
+        if rows is None:
+            out[:] = values
+        else:
+            out[:] = np.nan
+            found = rows >= 0
+            out[rows[found]] = values[found]
+        return out
+
+    def add_frame(self, stage, frame, key='essay_id', exclude=('essay_id', 'score'), categorical=()):
+        """Write the numeric and categorical columns of a pandas or Polars frame into a new stage.
+
+        The frame is read one column at a time, so only one column is ever
+        converted at once. pandas 'category' and Polars Categorical/Enum columns
+        are stored as their category codes, integer columns listed in categorical
+        as they are; both are flagged for LightGBM. Missing values are NaN.
+
+        Args:
+            stage (str): Name of the stage.
+            frame (_type_): pandas or Polars DataFrame with a key column.
+            key (str): Column holding the essay_id of every row.
+            exclude (tuple): Columns that are not features.
+            categorical (tuple): Integer-coded columns to flag as categorical.
+
+        Returns:
+            np.ndarray: The column slice written by the stage
+        """
+        names, codes = [], set()
+        for name in frame.columns:
+            kind = _column_kind(frame[name])
+            if name in exclude or kind is None:
+                continue
+            if kind == 'category' or name in categorical:
+                codes.add(name)
+            names.append(name)
+        out = self.reserve(stage, names, codes)
+        rows = self._rows(frame[key])
+        if rows is not None:
+            found = rows >= 0
+            out[:] = np.nan
+        for i, name in enumerate(names):
+            values = _column_values(frame[name], self.dtype)
+            if rows is None:
+                out[:, i] = values
+            else:
+                out[rows[found], i] = values[found]
+        return out
+
+    def add_sparse(self, stage, block):
+        """Scatter a SparseBlock (e.g. Generate_tfidf_sparse) into a new stage; absent entries are 0."""
+        out = self.reserve(stage, block.columns)
+        coo = align_block(block, self.essay_id).tocoo()
+        out[:] = 0
+        out[coo.row, coo.col] = coo.data
+        return out
+
+
+def build_feature_matrix(data, vectorizer=None, word_vectorizer=None, preprocessed=None, capacity=None):
+    """Assemble the handcrafted and TF-IDF features into one FeatureMatrix.
+
+    Every stage is computed without merging, its width is known before the buffer
+    is allocated, and each one is written straight into its own column slice.
+
+    Args:
+        data (_type_): pandas or Polars DataFrame with 'essay_id' and 'full_text'. Its row
+            order is the row order of the matrix, so data['score'] is the aligned target.
+        vectorizer (_type_): Optional fitted Vectorization vectorizer (fitted on data otherwise).
+        word_vectorizer (_type_): Optional fitted Word_vectorizer vectorizer (fitted on data otherwise).
+        preprocessed (_type_): Optional Preprocessor.run output; its numeric columns become a stage.
+        capacity (int): Columns to allocate, defaults to the total width of the stages.
+
+    Returns:
+        FeatureMatrix: matrix.X, matrix.feature_names and matrix.categorical_features feed LightGBM
+    """
+    text = Generate_text_features(pl.from_pandas(data) if isinstance(data, pd.DataFrame) else data)
+    blocks = {
+        'tfidf': Generate_tfidf_sparse(data, vectorizer=vectorizer),
+        'tfidf_w': generate_tfidf_sparse_with_stopwords(data, word_vectorizer=word_vectorizer),
+    }
+    # Upper bound of the feature count: essay_id and non-numeric columns are not written
+    width = text.width - 1 + sum(len(block.columns) for block in blocks.values())
+    if preprocessed is not None:
+        width += preprocessed.shape[1]
+    matrix = FeatureMatrix(data['essay_id'], capacity=capacity or width)
+    matrix.add_frame('text', text)
+    if preprocessed is not None:
+        matrix.add_frame('preprocessor', preprocessed)
+    for stage, block in blocks.items():
+        matrix.add_sparse(stage, block)
+    return matrix
+
+# Example usage
+# matrix = build_feature_matrix(train, preprocessed=Preprocessor().run(train[['essay_id', 'full_text']], mode='train'))
+# models, oof = train_folds(matrix.X, train['score'], matrix.feature_names,
+#                           categorical_feature=matrix.categorical_features)
@@ -0,0 +1,92 @@
+"""Single lazy query plan for the paragraph, sentence and word features.
+
+The eager path builds each granularity separately (explode, group_by, sort,
+to_pandas) and merges the pandas frames afterwards. Here the three explodes and
+aggregations are branches of one pl.LazyFrame that share the normalized text and
+are joined on essay_id inside Polars, so the only materialized result is the
+final Arrow-backed frame.
+
+While Instrumentation is enabled, Generate_text_features collects the shared
+normalization and every branch separately instead, so that each shows up as its
+own stage (Polars 2.0 has no per-node profile of a fused plan). The result is
+the same frame.
+"""
+
+import polars as pl
+from Instrumentation import count_rows, is_enabled, measure, stage
+from Paragraph_engineering import normalize_expr, paragraph_measures, paragraph_aggs
+from Sentence_engineering import sentence_measures, sentence_aggs
+from Word_engineering import word_measures, word_aggs
+
+def _base(data):
+    return data.lazy().select(
+        'essay_id',
+        'full_text',
+        # dataPreprocessing(full_text) is shared by the sentence and word branches
+        normalize_expr('full_text').alias('text_norm'),
+    )
+
+def _branches(base):
+    # Per-essay paragraph, sentence and word aggregations of the base
+    return {
+        'paragraph': paragraph_measures(
+            base.select('essay_id', pl.col('full_text').str.split(by="\n\n").alias('paragraph'))
+        ).group_by('essay_id').agg(paragraph_aggs()),
+        'sentence': sentence_measures(
+            base.select('essay_id', pl.col('text_norm').str.split(by=".").alias('sentence'))
+        ).group_by('essay_id').agg(sentence_aggs()),
+        'word': word_measures(
+            base.select('essay_id', pl.col('text_norm').str.split(by=" ").alias('word'))
+        ).group_by('essay_id').agg(word_aggs()),
+    }
+
+def _join(paragraph, sentence, word):
+    return (
+        paragraph
+        .join(sentence, on='essay_id', how='left')
+        .join(word, on='essay_id', how='left')
+        .sort('essay_id')
+    )
+
+def build_feature_plan(data):
+    """Build the fused paragraph/sentence/word feature plan.
+
+    Args:
+        data (_type_): Polars DataFrame or LazyFrame with 'essay_id' and 'full_text'.
+
+    Returns:
+        _type_: LazyFrame with one row per essay, sorted by essay_id
+    """
+    return _join(**_branches(_base(data)))
+
+def _collect_by_stage(data):
+    # Same result as build_feature_plan(data).collect(), measured per branch
+    rows = count_rows(data)
+    with measure('Feature_plan.normalize', rows) as m:
+        base = _base(data).collect()
+        m.rows_out = base.height
+    parts = {}
+    for name, branch in _branches(base.lazy()).items():
+        with measure(f'Feature_plan.{name}', base.height) as m:
+            parts[name] = branch.collect()
+            m.rows_out = parts[name].height
+    return _join(**{name: part.lazy() for name, part in parts.items()}).collect()
+
+@stage()
+def Generate_text_features(data, to_arrow=False):
+    """Collect the fused plan of build_feature_plan.
+
+    Args:
+        data (_type_): Polars DataFrame or LazyFrame with 'essay_id' and 'full_text'.
+        to_arrow (bool): Return a pyarrow Table instead of a Polars DataFrame.
+
+    Returns:
+        _type_: Polars DataFrame (or pyarrow Table) of paragraph, sentence and word features
+    """
+    df = _collect_by_stage(data) if is_enabled() else build_feature_plan(data).collect()
+    if to_arrow:
+        return df.to_arrow()
+    return df
+
+# Example usage
+# train_feats = Generate_text_features(pl.from_pandas(train)).to_pandas()
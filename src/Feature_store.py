@@ -0,0 +1,129 @@
+"""Content-addressed on-disk cache of per-essay feature rows.
+
+Rows are keyed by a hash of the essay text and stored as uncompressed Arrow IPC
+parts that are read back memory-mapped. Each feature set lives under a version
+directory derived from the source code of the functions that compute it, so
+editing a feature function invalidates its entries automatically. On an
+incremental run only the essays whose text is not in the store are computed,
+and only the stored rows of the requested essays are read.
+
+Layout: <root>/<name>/<version>/part-<n>.arrow
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+
+import pandas as pd
+import polars as pl
+
+
+def text_hash(texts):
+    """128-bit BLAKE2 hex digest of every text."""
+    return [hashlib.blake2b(t.encode('utf-8'), digest_size=16).hexdigest() for t in texts]
+
+
+def code_version(*funcs, extra=''):
+    """Short hash of the source code of funcs, plus an optional manual version string."""
+    h = hashlib.blake2b(extra.encode('utf-8'), digest_size=8)
+    for func in funcs:
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = f'{func.__module__}.{func.__qualname__}'
+        h.update(source.encode('utf-8'))
+    return h.hexdigest()
+
+
+class FeatureStore:
+    """Feature rows keyed by hash(full_text) + feature version.
+
+    Args:
+        root (str): Directory of the store.
+    """
+
+    def __init__(self, root='feature_store'):
+        self.root = root
+
+    def _dir(self, name, version):
+        return os.path.join(self.root, name, version)
+
+    def _parts(self, name, version):
+        path = self._dir(name, version)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.arrow'))
+
+    def scan(self, name, version):
+        """LazyFrame over all memory-mapped parts of a feature set, or None when it is empty."""
+        parts = self._parts(name, version)
+        if not parts:
+            return None
+        return pl.concat([pl.scan_ipc(p) for p in parts], how='diagonal_relaxed')
+
+    def _write(self, name, version, rows):
+        path = self._dir(name, version)
+        os.makedirs(path, exist_ok=True)
+        target = os.path.join(path, f'part-{len(self._parts(name, version)):05d}.arrow')
+        tmp = target + '.tmp'
+        # Uncompressed so that the part can be memory-mapped on read
+        rows.write_ipc(tmp, compression='uncompressed')
+        os.replace(tmp, target)
+
+    def get_or_compute(self, name, data, compute, funcs=(), version=''):
+        """Return the feature rows of every essay, computing only the missing ones.
+
+        Args:
+            name (str): Feature set name, e.g. 'paragraph'.
+            data (_type_): Polars or pandas DataFrame with 'essay_id' and 'full_text'.
+            compute (callable): Maps a Polars DataFrame of the missing essays to a
+                (pandas or Polars) feature frame with an 'essay_id' column.
+            funcs (tuple): Functions whose source defines the feature version,
+                defaults to (compute,).
+            version (str): Extra manual version string.
+
+        Returns:
+            pl.DataFrame: 'essay_id' followed by the feature columns, in the order of data
+        """
+        if isinstance(data, pd.DataFrame):
+            data = pl.from_pandas(data)
+        version = code_version(*(funcs or (compute,)), extra=version)
+        keyed = data.with_columns(pl.Series('text_hash', text_hash(data['full_text'])))
+        stored = self.scan(name, version)
+        found = None
+        missing = keyed
+        if stored is not None:
+            # Only the rows of these essays are read; the filter is pushed into the scan
+            found = stored.filter(pl.col('text_hash').is_in(keyed['text_hash'].unique().implode())).collect()
+            missing = keyed.join(found.select('text_hash'), on='text_hash', how='anti')
+        missing = missing.unique('text_hash', keep='first', maintain_order=True)
+        if missing.height:
+            feats = compute(missing.drop('text_hash'))
+            if isinstance(feats, pd.DataFrame):
+                feats = pl.from_pandas(feats)
+            rows = missing.select('essay_id', 'text_hash').join(feats, on='essay_id', how='left').drop('essay_id')
+            self._write(name, version, rows)
+            found = rows if found is None else pl.concat([found, rows], how='diagonal_relaxed')
+        return (
+            keyed.select('essay_id', 'text_hash').with_row_index('_row')
+            .join(found, on='text_hash', how='left')
+            .sort('_row')
+            .drop('_row', 'text_hash')
+        )
+
+    def prune(self, name, keep_version):
+        """Delete every version of a feature set except keep_version."""
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return
+        for version in os.listdir(path):
+            if version != keep_version:
+                shutil.rmtree(os.path.join(path, version))
+
+# Example usage
+# store = FeatureStore()
+# paragraph_feats = store.get_or_compute(
+#     'paragraph', train, lambda df: Paragraph_Eng(Paragraph_Preprocess(df.with_columns(columns))),
+#     funcs=(Paragraph_Preprocess, Paragraph_Eng, dataPreprocessing),
+# )
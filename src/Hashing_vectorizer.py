@@ -0,0 +1,193 @@
+"""Streaming TF-IDF based on feature hashing, for corpora that do not fit in memory.
+
+TfidfVectorizer needs the whole 'full_text' column to build a vocabulary before
+min_df/max_df can be applied. Here terms are hashed into a fixed number of buckets,
+document frequencies are accumulated chunk by chunk (and can be summed across
+processes), and every chunk is emitted as its own sparse block. Memory is bounded by
+the chunk size and n_features, and the output keeps the 'tfid_i' / 'tfid_w_i'
+column contract of Vectorization.py and Word_vectorizer.py.
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from nltk.corpus import stopwords
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from feature_engineering import normalize_batch
+from Sparse_features import SparseBlock
+from Vectorization import identity
+
+
+def bounded_map(executor, fn, iterable, window):
+    """Like executor.map, but never has more than `window` tasks in flight.
+
+    Results are yielded in input order and the input is consumed lazily, so a
+    chunk reader is never read ahead by more than `window` chunks.
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# Vectorizer shipped once to every worker process by _init_worker
+_WORKER = None
+
+def _init_worker(vectorizer):
+    global _WORKER
+    _WORKER = vectorizer
+
+def _worker_frequencies(texts):
+    return _WORKER.document_frequencies(texts)
+
+def _worker_transform(chunk, text_col='full_text'):
+    return _WORKER.transform_chunk(chunk, text_col)
+
+
+class StreamingTfidfVectorizer:
+    """Hashed TF-IDF with an incremental document-frequency estimate.
+
+    Args:
+        prefix (str): Output column prefix ('tfid_' or 'tfid_w_').
+        n_features (int): Number of hash buckets.
+        min_df (float | int): Same meaning as in TfidfVectorizer.
+        max_df (float | int): Same meaning as in TfidfVectorizer.
+        sublinear_tf (bool): Use 1 + log(tf).
+        normalize_text (bool): Apply dataPreprocessing_w_contract_punct_remove before hashing.
+        **hash_kwargs: Tokenization arguments passed to HashingVectorizer.
+    """
+
+    def __init__(self, prefix='tfid_', n_features=2**20, min_df=0.05, max_df=0.95,
+                 sublinear_tf=True, normalize_text=False, **hash_kwargs):
+        self.prefix = prefix
+        self.n_features = n_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.sublinear_tf = sublinear_tf
+        self.normalize_text = normalize_text
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, **hash_kwargs)
+        self.df_counts = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self._kept = None
+        self._idf = None
+
+    def _hash(self, texts):
+        texts = normalize_batch(texts, contract=True, punct_remove=True) if self.normalize_text else list(texts)
+        return self.hasher.transform(texts)
+
+    def document_frequencies(self, texts):
+        """Document frequency of every bucket in one chunk of texts."""
+        X = self._hash(texts)
+        X.sum_duplicates()
+        return np.bincount(X.indices, minlength=self.n_features), X.shape[0]
+
+    def add_counts(self, df_counts, n_docs):
+        """Fold the counts of one chunk into the running estimate."""
+        self.df_counts += df_counts
+        self.n_docs += n_docs
+        self._kept = None
+        return self
+
+    def partial_fit(self, texts):
+        return self.add_counts(*self.document_frequencies(texts))
+
+    def fit_chunks(self, chunks, text_col='full_text', n_jobs=1):
+        """Accumulate document frequencies over an iterable of DataFrame chunks.
+
+        With n_jobs > 1 chunks are hashed in worker processes and only the
+        per-chunk count vectors are sent back and summed.
+        """
+        texts = (chunk[text_col] for chunk in chunks)
+        if n_jobs == 1:
+            for t in texts:
+                self.partial_fit(t)
+            return self
+        # Spawned, not forked: forking after Polars has started its thread pool can deadlock
+        with ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            for counts in bounded_map(executor, _worker_frequencies, texts, 2 * n_jobs):
+                self.add_counts(*counts)
+        return self
+
+    def _finalize(self):
+        min_count = self.min_df if isinstance(self.min_df, int) else self.min_df * self.n_docs
+        max_count = self.max_df if isinstance(self.max_df, int) else self.max_df * self.n_docs
+        self._kept = np.flatnonzero((self.df_counts >= max(min_count, 1)) & (self.df_counts <= max_count))
+        df = self.df_counts[self._kept]
+        # Smoothed idf, as in TfidfVectorizer
+        self._idf = np.log((1 + self.n_docs) / (1 + df)) + 1
+
+    @property
+    def columns(self):
+        if self._kept is None:
+            self._finalize()
+        return [f'{self.prefix}{i}' for i in range(len(self._kept))]
+
+    def transform(self, texts):
+        """TF-IDF rows for one chunk, restricted to the buckets kept by min_df/max_df."""
+        if self._kept is None:
+            self._finalize()
+        X = self._hash(texts).tocsc()[:, self._kept].tocsr()
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1
+        X = X.multiply(self._idf).tocsr()
+        return normalize(X)
+
+    def transform_chunk(self, chunk, text_col='full_text'):
+        return SparseBlock(self.transform(chunk[text_col]), self.columns, chunk['essay_id'].to_numpy())
+
+    def transform_chunks(self, chunks, text_col='full_text', n_jobs=1):
+        """Yield one SparseBlock per chunk, in order."""
+        if self._kept is None:
+            self._finalize()
+        if n_jobs == 1:
+            for chunk in chunks:
+                yield self.transform_chunk(chunk, text_col)
+            return
+        # Spawned, not forked: forking after Polars has started its thread pool can deadlock
+        with ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            yield from bounded_map(executor, partial(_worker_transform, text_col=text_col), chunks, 2 * n_jobs)
+
+
+def make_streaming_tfidf(n_features=2**20):
+    """Hashed counterpart of Vectorization.make_tfidf_vectorizer."""
+    return StreamingTfidfVectorizer(
+        prefix='tfid_',
+        n_features=n_features,
+        tokenizer=identity,
+        preprocessor=identity,
+        token_pattern=None,
+        strip_accents='unicode',
+        analyzer='word',
+        ngram_range=(1, 3),
+    )
+
+
+def make_streaming_word_tfidf(n_features=2**20, min_df=0.05, max_df=0.95):
+    """Hashed counterpart of Word_vectorizer.make_word_vectorizer."""
+    return StreamingTfidfVectorizer(
+        prefix='tfid_w_',
+        n_features=n_features,
+        min_df=min_df,
+        max_df=max_df,
+        normalize_text=True,
+        strip_accents='ascii',
+        analyzer='word',
+        ngram_range=(1, 1),
+        stop_words=stopwords.words('english'),
+    )
+
+# Example usage
+# vectorizer = make_streaming_tfidf().fit_chunks(load_train_chunks(), n_jobs=8)
+# for block in vectorizer.transform_chunks(load_train_chunks(), n_jobs=8):
+#     ...
@@ -0,0 +1,224 @@
+"""Incremental feature updates for an append-only essay corpus.
+
+The whole-corpus functions (Generate_tfidf_features, Paragraph_Eng,
+Preprocessor.run) reprocess every essay on each refresh. The per-essay
+aggregates do not depend on the other essays, so they are computed only for the
+appended essays and cached in the FeatureStore. TF-IDF is the one corpus-level
+statistic: IncrementalTfidf keeps the raw term counts of every essay and running
+document frequencies over the fitted vocabulary, and only recomputes the IDF
+weights once they drift past a tolerance. At that point it reports which
+existing rows were computed with weights that are now out of date.
+"""
+
+from functools import partial
+
+import numpy as np
+import polars as pl
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from artifacts import load_artifact, save_artifact
+from feature_engineering import ContractionExpander, TextNormalizer, cList, normalize_batch
+from Feature_plan import Generate_text_features, _base, _branches, _join, build_feature_plan
+from Feature_store import FeatureStore
+from Paragraph_engineering import normalize_expr, paragraph_aggs, paragraph_measures
+from Preprocessor import SpellingCache
+from Sentence_engineering import sentence_aggs, sentence_measures
+from Sparse_features import SparseBlock
+from Word_engineering import word_aggs, word_measures
+
+# Source of these functions versions the cached text features
+TEXT_FEATURE_FUNCS = (
+    Generate_text_features, build_feature_plan, _base, _branches, _join, normalize_expr, normalize_batch, TextNormalizer,
+    paragraph_measures, paragraph_aggs, sentence_measures, sentence_aggs, word_measures, word_aggs,
+)
+# ... and, together with the Preprocessor class, the cached Preprocessor features
+PREPROCESSOR_FEATURE_FUNCS = (normalize_batch, TextNormalizer, ContractionExpander, SpellingCache)
+# cList is data, not code, so its contents go into the version string
+PREPROCESSOR_FEATURE_VERSION = repr(sorted(cList.items()))
+
+
+class IncrementalTfidf:
+    """TF-IDF over a fixed fitted vocabulary with running document frequencies.
+
+    The vocabulary, tokenization and tf/normalization settings come from a fitted
+    TfidfVectorizer; the column layout never changes, so a trained model stays
+    valid. Appending K essays costs O(K) plus one O(vocabulary) drift check; the
+    stored counts of earlier essays are only stacked when a refresh has to find
+    the stale rows.
+
+    Args:
+        vectorizer (_type_): Fitted TfidfVectorizer (e.g. fit_tfidf_vectorizer).
+        prefix (str): Column name prefix, 'tfid_' or 'tfid_w_'.
+        preprocess (callable): Optional batch function applied to the texts before vectorizing.
+        tolerance (float): Largest relative IDF change that is tolerated before the weights are refreshed.
+    """
+
+    def __init__(self, vectorizer, prefix='tfid_', preprocess=None, tolerance=0.01):
+        self.vectorizer = vectorizer
+        self.columns = [f'{prefix}{i}' for i in range(len(vectorizer.vocabulary_))]
+        self.preprocess = preprocess
+        self.tolerance = tolerance
+        self.n_docs = 0
+        self.df = np.zeros(len(self.columns), dtype=np.int64)
+        # Weights the emitted rows were computed with; the fitted ones until the first refresh
+        self.idf = vectorizer.idf_.copy() if vectorizer.use_idf else np.ones(len(self.columns))
+        self.row = {}
+        self._chunks = []
+        self._counts = None
+
+    def counts(self):
+        """Raw term counts of every appended essay, one CSR row per essay in append order."""
+        if self._chunks:
+            blocks = ([self._counts] if self._counts is not None else []) + self._chunks
+            self._counts = sp.vstack(blocks, format='csr')
+            self._chunks = []
+        if self._counts is None:
+            return sp.csr_matrix((0, len(self.columns)))
+        return self._counts
+
+    def current_idf(self):
+        """IDF of the running document frequencies (sklearn's smooth_idf formula)."""
+        if not self.vectorizer.use_idf:
+            return np.ones(len(self.columns))
+        smooth = int(self.vectorizer.smooth_idf)
+        return np.log((self.n_docs + smooth) / (self.df + smooth)) + 1.0
+
+    def drift(self, idf=None):
+        """Largest relative difference between the running IDF and the weights in use."""
+        idf = self.current_idf() if idf is None else idf
+        return float(np.max(np.abs(idf - self.idf) / self.idf, initial=0.0))
+
+    def _weights(self, counts):
+        X = counts.astype(np.float64)
+        if self.vectorizer.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        X = X @ sp.diags(self.idf)
+        return normalize(X, norm=self.vectorizer.norm, copy=False) if self.vectorizer.norm else X.tocsr()
+
+    def append(self, essay_id, texts):
+        """Add essays, refresh the IDF if it drifted and return the new rows.
+
+        Args:
+            essay_id (_type_): Ids of the new essays (must not have been appended before).
+            texts (_type_): Their 'full_text'.
+
+        Returns:
+            block: SparseBlock of the new essays, weighted with the current IDF
+            stale: essay_id of the earlier rows whose weights changed (empty without a refresh)
+
+        Raises:
+            ValueError: If an essay_id was already appended.
+        """
+        essay_id = np.asarray(essay_id)
+        known = [i for i in essay_id if i in self.row]
+        if known or len(set(essay_id.tolist())) != len(essay_id):
+            raise ValueError(f"Essays are already in the corpus: {known[:5]}")
+        texts = self.preprocess(texts) if self.preprocess is not None else list(texts)
+        # CountVectorizer.transform of the fitted vectorizer gives its raw counts with the same analyzer
+        counts = CountVectorizer.transform(self.vectorizer, texts).tocsr()
+        self.df += np.bincount(counts.indices, minlength=len(self.columns))
+        self.n_docs += len(essay_id)
+        stale = self._refresh()
+        offset = len(self.row)
+        self.row.update((i, offset + k) for k, i in enumerate(essay_id.tolist()))
+        self._chunks.append(counts)
+        return SparseBlock(self._weights(counts), self.columns, essay_id), stale
+
+    def _refresh(self):
+        # Swap in the running IDF when it drifted too far; earlier rows using a changed column are stale
+        idf = self.current_idf()
+        if self.drift(idf) <= self.tolerance:
+            return np.array([], dtype=object)
+        changed = np.abs(idf - self.idf) / self.idf > self.tolerance
+        self.idf = idf
+        # Called before the new essays' counts are added, so these are the earlier rows only
+        touched = self.counts() @ changed.astype(np.float64)
+        ids = np.array(list(self.row), dtype=object)
+        return ids[np.flatnonzero(touched)]
+
+    def transform(self, essay_id=None):
+        """SparseBlock of already appended essays (default: all), weighted with the current IDF."""
+        counts = self.counts()
+        if essay_id is None:
+            return SparseBlock(self._weights(counts), self.columns, np.array(list(self.row), dtype=object))
+        essay_id = np.asarray(essay_id)
+        rows = [self.row[i] for i in essay_id.tolist()]
+        return SparseBlock(self._weights(counts[rows]), self.columns, essay_id)
+
+
+class IncrementalFeatures:
+    """Append-only feature state: cached per-essay aggregates and both TF-IDF views.
+
+    Args:
+        vectorizer (_type_): Fitted Vectorization vectorizer.
+        word_vectorizer (_type_): Fitted Word_vectorizer vectorizer.
+        store (FeatureStore): Cache of the per-essay aggregates.
+        preprocessor (_type_): Optional Preprocessor; its features are cached as well.
+        tolerance (float): IDF drift tolerance of both TF-IDF views.
+    """
+
+    def __init__(self, vectorizer, word_vectorizer, store=None, preprocessor=None, tolerance=0.01):
+        self.store = store or FeatureStore()
+        self.preprocessor = preprocessor
+        self.views = [
+            IncrementalTfidf(vectorizer, 'tfid_', tolerance=tolerance),
+            IncrementalTfidf(word_vectorizer, 'tfid_w_', tolerance=tolerance,
+                             preprocess=partial(normalize_batch, contract=True, punct_remove=True)),
+        ]
+
+    def _preprocessor_features(self, data):
+        pre = self.preprocessor.run(data.select('essay_id', 'full_text').to_pandas(), mode='test', verbose=False)
+        return pre.drop(columns=['full_text', 'processed_text', 'text_tokens'])
+
+    def append(self, data):
+        """Compute the features of newly arrived essays only.
+
+        Args:
+            data (_type_): Polars or pandas DataFrame with 'essay_id' and 'full_text' of the new essays.
+
+        Returns:
+            feats: pl.DataFrame of the per-essay aggregates, in the order of data
+            blocks: one SparseBlock per TF-IDF view for the new essays
+            stale: essay_id of earlier essays whose TF-IDF rows should be re-read with transform
+        """
+        if not isinstance(data, pl.DataFrame):
+            data = pl.from_pandas(data)
+        feats = self.store.get_or_compute('text', data, Generate_text_features, funcs=TEXT_FEATURE_FUNCS)
+        if self.preprocessor is not None:
+            pre = self.store.get_or_compute('preprocessor', data, self._preprocessor_features,
+                                            funcs=(type(self.preprocessor), *PREPROCESSOR_FEATURE_FUNCS),
+                                            version=PREPROCESSOR_FEATURE_VERSION)
+            feats = feats.join(pre, on='essay_id', how='left', maintain_order='left')
+        blocks, stale = [], set()
+        for view in self.views:
+            block, view_stale = view.append(data['essay_id'].to_numpy(), data['full_text'].to_list())
+            blocks.append(block)
+            stale.update(view_stale.tolist())
+        return feats, blocks, sorted(stale)
+
+    def transform(self, essay_id=None):
+        """Current TF-IDF blocks of already appended essays (default: all)."""
+        return [view.transform(essay_id) for view in self.views]
+
+    def __getstate__(self):
+        # The Preprocessor's lru_cache'd spell lookup does not pickle; load() reattaches it
+        return {**self.__dict__, 'preprocessor': None}
+
+    def save(self, path):
+        save_artifact(self, path)
+
+    @staticmethod
+    def load(path, preprocessor=None):
+        state = load_artifact(path)
+        state.preprocessor = preprocessor
+        return state
+
+# Example usage
+# state = IncrementalFeatures(load_artifact(ARTIFACTS.tfidf_path), load_artifact(ARTIFACTS.word_tfidf_path))
+# state.append(train)                                  # history, once
+# feats, blocks, stale = state.append(todays_essays)   # daily, O(new essays)
+# refreshed = state.transform(stale)
+# state.save('incremental_state.pkl')
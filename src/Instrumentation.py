@@ -0,0 +1,283 @@
+"""Opt-in stage profiling for the feature pipeline.
+
+Pipeline functions are wrapped with @stage, and sub-steps use the measure()
+context manager. While profiling is disabled (the default) a wrapped call costs
+one flag check. Once enable() is called, or FEATURE_PROFILE=1 is set, every stage
+records its calls, wall time, rows in and out, and how far it raised the
+process's peak RSS. With allocations=True it also records the peak tracemalloc
+allocation. The totals per stage are exported as JSON or in the Prometheus text
+format.
+
+Worker processes measure their own stages: a pool initializer passes
+worker_settings() to init_worker, every task returns drain() next to its result,
+and the parent adds those stats to its own with merge(). Merged wall times are
+summed over the workers, so they can exceed the elapsed time of the run.
+"""
+
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+
+class _State:
+    enabled = os.environ.get('FEATURE_PROFILE', '') not in ('', '0')
+    allocations = False
+
+
+_STATE = _State()
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_STATS = {}
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def enable(allocations=False):
+    """Start recording stages; allocations=True also traces Python allocations (slower)."""
+    _STATE.enabled = True
+    _STATE.allocations = allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    _STATE.enabled = False
+    if _STATE.allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _STATE.allocations = False
+
+
+def is_enabled():
+    return _STATE.enabled
+
+
+def reset():
+    with _LOCK:
+        _STATS.clear()
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def count_rows(obj):
+    """Row count of a stage input or output, or None when it has no row count.
+
+    A str is one row. Polars frames use height, arrays/matrices shape[0], tuples
+    (e.g. (train_feats, feature_names) or a SparseBlock) their first element.
+    """
+    if obj is None:
+        return None
+    if isinstance(obj, str):
+        return 1
+    if isinstance(obj, tuple):
+        return count_rows(obj[0]) if obj else None
+    height = getattr(obj, 'height', None)
+    if isinstance(height, int):
+        return height
+    shape = getattr(obj, 'shape', None)
+    if shape:
+        return shape[0]
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class measure:
+    """Context manager that records one call of a stage.
+
+    Set rows_out on the yielded object to record the output size.
+
+    Args:
+        name (str): Stage name.
+        rows_in (int): Rows going into the stage, if known.
+    """
+
+    __slots__ = ('name', 'rows_in', 'rows_out', 'active', 'start', 'rss', 'traced', 'peak')
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.active = False
+
+    def __enter__(self):
+        if not _STATE.enabled:
+            return self
+        self.active = True
+        self.rss = _peak_rss()
+        if _STATE.allocations and tracemalloc.is_tracing():
+            stack = _frames()
+            _fold_peak(stack)
+            tracemalloc.reset_peak()
+            self.traced = tracemalloc.get_traced_memory()[0]
+            self.peak = self.traced
+            stack.append(self)
+        else:
+            self.traced = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not self.active:
+            return False
+        elapsed = time.perf_counter() - self.start
+        allocated = None
+        if self.traced is not None:
+            stack = _frames()
+            _fold_peak(stack)
+            stack.remove(self)
+            allocated = self.peak - self.traced
+        rss = _peak_rss()
+        _record(self.name, elapsed, self.rows_in, self.rows_out, rss, rss - self.rss, allocated)
+        return False
+
+
+def _frames():
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+def _fold_peak(stack):
+    # tracemalloc has a single peak; hand it to every open stage before it is reset
+    peak = tracemalloc.get_traced_memory()[1]
+    for frame in stack:
+        frame.peak = max(frame.peak, peak)
+
+
+def _record(name, elapsed, rows_in, rows_out, rss, rss_growth, allocated):
+    with _LOCK:
+        stats = _STATS.get(name)
+        if stats is None:
+            stats = _STATS[name] = {
+                'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows_in': 0, 'rows_out': 0,
+                'peak_rss_bytes': 0, 'rss_growth_bytes': 0, 'alloc_peak_bytes': None,
+            }
+        stats['calls'] += 1
+        stats['seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        stats['rows_in'] += rows_in or 0
+        stats['rows_out'] += rows_out or 0
+        stats['peak_rss_bytes'] = max(stats['peak_rss_bytes'], rss)
+        stats['rss_growth_bytes'] += rss_growth
+        if allocated is not None:
+            stats['alloc_peak_bytes'] = max(stats['alloc_peak_bytes'] or 0, allocated)
+
+
+def stage(name=None, arg=0):
+    """Decorator that measures every call of a function as a stage.
+
+    Args:
+        name (str): Stage name, defaults to the function's qualified name.
+        arg (int): Position of the argument whose rows are counted as rows_in
+            (1 for methods, None to skip).
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _STATE.enabled:
+                return func(*args, **kwargs)
+            rows_in = count_rows(args[arg]) if arg is not None and len(args) > arg else None
+            with measure(stage_name, rows_in) as m:
+                result = func(*args, **kwargs)
+                m.rows_out = count_rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def report():
+    """Totals of every recorded stage, keyed by stage name."""
+    with _LOCK:
+        return {name: dict(stats) for name, stats in _STATS.items()}
+
+
+def drain():
+    """Report and reset the totals; a pool worker returns this with every task."""
+    with _LOCK:
+        stats = {name: dict(values) for name, values in _STATS.items()}
+        _STATS.clear()
+    return stats
+
+
+def merge(stats):
+    """Add a report of another process (e.g. a worker's drain()) to this process's totals.
+
+    Counters are summed; max_seconds, peak_rss_bytes and alloc_peak_bytes keep the maximum.
+    """
+    with _LOCK:
+        for name, values in stats.items():
+            totals = _STATS.get(name)
+            if totals is None:
+                _STATS[name] = dict(values)
+                continue
+            for key in ('calls', 'seconds', 'rows_in', 'rows_out', 'rss_growth_bytes'):
+                totals[key] += values[key]
+            for key in ('max_seconds', 'peak_rss_bytes', 'alloc_peak_bytes'):
+                if values[key] is not None:
+                    totals[key] = max(totals[key] or 0, values[key])
+
+
+def worker_settings():
+    """Profiling settings of this process, to hand to init_worker in a pool initializer."""
+    return _STATE.enabled, _STATE.allocations
+
+
+def init_worker(settings):
+    """Apply worker_settings() of the parent inside a worker process."""
+    enabled, allocations = settings
+    if enabled:
+        enable(allocations)
+
+
+def to_json(path=None):
+    """Report as a JSON string; also written to path when given."""
+    text = json.dumps({'pid': os.getpid(), 'stages': report()}, indent=2)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+_METRICS = (
+    ('calls', 'counter', 'Calls of the stage'),
+    ('seconds', 'counter', 'Wall time spent in the stage'),
+    ('max_seconds', 'gauge', 'Longest single call of the stage'),
+    ('rows_in', 'counter', 'Rows passed into the stage'),
+    ('rows_out', 'counter', 'Rows returned by the stage'),
+    ('peak_rss_bytes', 'gauge', 'Process peak RSS after the stage'),
+    ('rss_growth_bytes', 'counter', 'Increase of the process peak RSS during the stage'),
+    ('alloc_peak_bytes', 'gauge', 'Peak traced Python allocations within one call of the stage'),
+)
+
+
+def to_prometheus(prefix='feature_stage'):
+    """Report in the Prometheus text exposition format, one sample per stage and metric."""
+    stats = report()
+    lines = []
+    for key, kind, help_text in _METRICS:
+        metric = f'{prefix}_{key}_total' if kind == 'counter' else f'{prefix}_{key}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for name, values in stats.items():
+            if values[key] is not None:
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {values[key]}')
+    return '\n'.join(lines) + '\n'
+
+# Example usage
+# enable()                       # or FEATURE_PROFILE=1
+# train_feats = Paragraph_Eng(Paragraph_Preprocess(train))
+# print(to_json())
+# open('metrics.prom', 'w').write(to_prometheus())
@@ -1,18 +1,45 @@
 import polars as pl
-from feature_engineering import dataPreprocessing
+from feature_engineering import dataPreprocessing, normalize_batch
+from Instrumentation import stage
 
-def Paragraph_Preprocess(tmp):
+def normalize_expr(col):
+    """Batch UDF applying dataPreprocessing to a whole string column at once."""
+    return pl.col(col).map_batches(lambda s: pl.Series(s.name, normalize_batch(s), dtype=pl.String),
+                                   return_dtype=pl.String)
+
+def paragraph_measures(tmp):
+    """Native part of Paragraph_Preprocess, usable on a DataFrame or a LazyFrame."""
+    # Expand the paragraph list into several lines of data
+    tmp = tmp.explode('paragraph')
+    # Paragraph preprocessing
+    tmp = tmp.with_columns(normalize_expr('paragraph'))
+    # len(x), len(x.split('.')) and len(x.split(' ')) as native expressions
+    return tmp.with_columns(
+        pl.col('paragraph').str.len_chars().cast(pl.Int64).alias("paragraph_len"),
+        (pl.col('paragraph').str.count_matches('.', literal=True).cast(pl.Int64) + 1).alias("paragraph_sentence_cnt"),
+        (pl.col('paragraph').str.count_matches(' ', literal=True).cast(pl.Int64) + 1).alias("paragraph_word_cnt"),
+    )
+
+@stage()
+def Paragraph_Preprocess(tmp, native=True):
     """This function takes a DataFrame as input and performs the following operations:-
         - It explodes the 'paragraph' column, which likely means that if there were multiple paragraphs in a single row, it separates them into individual rows.
-        - It preprocesses each paragraph using the function dataPreprocessing (not defined in the provided code).
+        - It preprocesses each paragraph using the function dataPreprocessing from feature_engineering.
         - It calculates the length of each paragraph (paragraph_len), the number of sentences in each paragraph (paragraph_sentence_cnt), and the number of words in each paragraph (paragraph_word_cnt).
 
+    With native=True the measures are built from native `str` expressions and the
+    preprocessing runs as one batch UDF, so no Python lambda is called per row.
+    native=False keeps the original map_elements path; both give identical columns.
+
     Args:
-        tmp (_type_): DataFrame 
+        tmp (_type_): DataFrame
+        native (bool): Use native Polars expressions.
 
     Returns:
         _type_: DataFrame 
     """
+    if native:
+        return paragraph_measures(tmp)
     # Expand the paragraph list into several lines of data
     tmp = tmp.explode('paragraph')
     # Paragraph preprocessing
@@ -25,7 +52,29 @@ def Paragraph_Preprocess(tmp):
     return tmp
 
 paragraph_fea = ['paragraph_len','paragraph_sentence_cnt','paragraph_word_cnt']
+# paragraph_{i}_cnt thresholds: paragraphs at least / at most i characters long
+paragraph_ge = [50,75,100,125,150,175,200,250,300,350,400,500,600,700]
+paragraph_le = [25,49]
 
+def paragraph_aggs():
+    """Per-essay aggregations used by Paragraph_Eng and the lazy feature plan."""
+    return [
+        # Count the number of paragraph lengths greater than and less than the i-value
+        *[pl.col('paragraph').filter(pl.col('paragraph_len') >= i).count().alias(f"paragraph_{i}_cnt") for i in paragraph_ge], 
+        *[pl.col('paragraph').filter(pl.col('paragraph_len') <= i).count().alias(f"paragraph_{i}_cnt") for i in paragraph_le], 
+        # other
+        *[pl.col(fea).max().alias(f"{fea}_max") for fea in paragraph_fea],
+        *[pl.col(fea).mean().alias(f"{fea}_mean") for fea in paragraph_fea],
+        *[pl.col(fea).min().alias(f"{fea}_min") for fea in paragraph_fea],
+        *[pl.col(fea).first().alias(f"{fea}_first") for fea in paragraph_fea],
+        *[pl.col(fea).last().alias(f"{fea}_last") for fea in paragraph_fea],
+        *[pl.col(fea).sum().alias(f"{fea}_sum") for fea in paragraph_fea],
+        *[pl.col(fea).kurtosis().alias(f"{fea}_kurtosis") for fea in paragraph_fea],
+        *[pl.col(fea).quantile(0.25).alias(f"{fea}_q1") for fea in paragraph_fea],  
+        *[pl.col(fea).quantile(0.75).alias(f"{fea}_q3") for fea in paragraph_fea],
+    ]
+
+@stage()
 def Paragraph_Eng(train_tmp):
     """This function takes a DataFrame train as input (presumably the output of Paragraph_Preprocess) and performs the following feature engineering steps:
 
@@ -39,21 +88,6 @@ def Paragraph_Eng(train_tmp):
     Returns:
         _type_: DataFrame
     """
-    aggs = [
-        # Count the number of paragraph lengths greater than and less than the i-value
-        *[pl.col('paragraph').filter(pl.col('paragraph_len') >= i).count().alias(f"paragraph_{i}_cnt") for i in [50,75,100,125,150,175,200,250,300,350,400,500,600,700] ], 
-        *[pl.col('paragraph').filter(pl.col('paragraph_len') <= i).count().alias(f"paragraph_{i}_cnt") for i in [25,49]], 
-        # other
-        *[pl.col(fea).max().alias(f"{fea}_max") for fea in paragraph_fea],
-        *[pl.col(fea).mean().alias(f"{fea}_mean") for fea in paragraph_fea],
-        *[pl.col(fea).min().alias(f"{fea}_min") for fea in paragraph_fea],
-        *[pl.col(fea).first().alias(f"{fea}_first") for fea in paragraph_fea],
-        *[pl.col(fea).last().alias(f"{fea}_last") for fea in paragraph_fea],
-        *[pl.col(fea).sum().alias(f"{fea}_sum") for fea in paragraph_fea],
-        *[pl.col(fea).kurtosis().alias(f"{fea}_kurtosis") for fea in paragraph_fea],
-        *[pl.col(fea).quantile(0.25).alias(f"{fea}_q1") for fea in paragraph_fea],  
-        *[pl.col(fea).quantile(0.75).alias(f"{fea}_q3") for fea in paragraph_fea],
-    ]
-    df = train_tmp.group_by(['essay_id'], maintain_order=True).agg(aggs).sort("essay_id")
+    df = train_tmp.group_by(['essay_id'], maintain_order=True).agg(paragraph_aggs()).sort("essay_id")
     df = df.to_pandas()
-    return df
\ No newline at end of file
+    return df
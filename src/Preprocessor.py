@@ -1,9 +1,50 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import pandas as pd
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from nltk.tokenize.treebank import TreebankWordDetokenizer
 from spellchecker import SpellChecker
-from feature_engineering import dataPreprocessing_w_contract_punct_remove
+from feature_engineering import normalize_batch
+from Instrumentation import drain, init_worker, measure, merge, stage, worker_settings
+
+
+class SpellingCache:
+    """Token-level known/unknown cache shared by all essays.
+
+    The SpellChecker dictionary is preloaded into a frozenset, so most tokens are
+    settled by a plain set difference. The few tokens left over go through
+    SpellChecker.unknown once each and the answer is kept in an LRU cache.
+    """
+    def __init__(self, spellchecker, maxsize=2**18) -> None:
+        self.spellchecker = spellchecker
+        self.known = frozenset(spellchecker.word_frequency.dictionary)
+        self.lookup = lru_cache(maxsize=maxsize)(self._lookup)
+
+    def _lookup(self, token):
+        # The lowercased token if SpellChecker reports it as unknown, otherwise None
+        return next(iter(self.spellchecker.unknown([token])), None)
+
+    def unknown(self, tokens):
+        """Same set as SpellChecker.unknown(tokens)."""
+        unknown = {self.lookup(t) for t in set(tokens).difference(self.known)}
+        unknown.discard(None)
+        return unknown
+
+    def count_unknown_batch(self, texts):
+        """Number of unknown words of every text, resolving each distinct token once.
+
+        Args:
+            texts: Iterable of texts, split on whitespace.
+
+        Returns:
+            list: len(SpellChecker.unknown(text.split())) for every text
+        """
+        token_sets = [set(text.split()) for text in texts]
+        vocabulary = set().union(*token_sets).difference(self.known)
+        unknown = {t: w for t, w in zip(vocabulary, map(self.lookup, vocabulary)) if w is not None}
+        return [len({unknown[t] for t in tokens if t in unknown}) for tokens in token_sets]
 
 
 class Preprocessor:
@@ -11,10 +52,11 @@ class Preprocessor:
         self.twd = TreebankWordDetokenizer()
         self.STOP_WORDS = set(stopwords.words('english'))
         self.spellchecker = SpellChecker()
+        self.spell_cache = SpellingCache(self.spellchecker)
 
     def spelling(self, text):
         wordlist=text.split()
-        amount_miss = len(list(self.spellchecker.unknown(wordlist)))
+        amount_miss = len(self.spell_cache.unknown(wordlist))
         return amount_miss
     
     def count_sym(self, text, sym):
@@ -24,37 +66,84 @@ class Preprocessor:
                 sym_count += 1
         return sym_count
 
-    def run(self, data: pd.DataFrame, mode:str) -> pd.DataFrame:
-        
+    @stage('Preprocessor.run', arg=1)
+    def run(self, data: pd.DataFrame, mode:str, n_jobs:int=1, verbose:bool=True) -> pd.DataFrame:
+        """Add the processed text, token, count and spelling columns to data.
+
+        With n_jobs > 1 the frame is split into contiguous chunks that go through the
+        whole per-essay pipeline in spawned worker processes. Every worker builds its own
+        Preprocessor (NLTK data, SpellChecker and spelling cache) once, and the chunks
+        are concatenated back in their original order into a new frame. Workers never
+        print; verbose=False also silences the progress message of this call. When
+        Instrumentation is enabled, the workers' stage stats are merged into this process's.
+        """
+        if n_jobs > 1 and len(data) > 0:
+            # A few chunks per worker so that uneven essays still balance out
+            n_chunks = min(len(data), 4 * n_jobs)
+            bounds = [len(data) * i // n_chunks for i in range(n_chunks + 1)]
+            chunks = [data.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+            # Spawned, not forked: the caller may already be running Polars or BLAS threads
+            with ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(worker_settings(),)) as executor:
+                results = list(executor.map(_run_chunk, chunks))
+            for _, stats in results:
+                merge(stats)
+            data = pd.concat([chunk for chunk, _ in results])
+        else:
+            data = self._run_steps(data)
+        if verbose:
+            print("Spelling mistake count done")
+        return data
+
+    def _run_steps(self, data: pd.DataFrame) -> pd.DataFrame:
         # preprocessing the text
-        data["processed_text"] = data["full_text"].apply(lambda x: dataPreprocessing_w_contract_punct_remove(x))
+        data["processed_text"] = normalize_batch(data["full_text"], contract=True, punct_remove=True)
         
         # Text tokenization
-        data["text_tokens"] = data["processed_text"].apply(lambda x: word_tokenize(x))
-        
-        # essay length
-        data["text_length"] = data["processed_text"].apply(lambda x: len(x))
-        
-        # essay word count
-        data["word_count"] = data["text_tokens"].apply(lambda x: len(x))
-        
-        # essay unique word count
-        data["unique_word_count"] = data["text_tokens"].apply(lambda x: len(set(x)))
-        
-        # essay sentence count
-        data["sentence_count"] = data["full_text"].apply(lambda x: len(x.split('.')))
+        with measure('Preprocessor.tokenize', len(data)):
+            data["text_tokens"] = data["processed_text"].apply(lambda x: word_tokenize(x))
         
-        # essay paragraph count
-        data["paragraph_count"] = data["full_text"].apply(lambda x: len(x.split('\n\n')))
+        with measure('Preprocessor.counts', len(data)):
+            # essay length
+            data["text_length"] = data["processed_text"].apply(lambda x: len(x))
+            
+            # essay word count
+            data["word_count"] = data["text_tokens"].apply(lambda x: len(x))
+            
+            # essay unique word count
+            data["unique_word_count"] = data["text_tokens"].apply(lambda x: len(set(x)))
+            
+            # essay sentence count
+            data["sentence_count"] = data["full_text"].apply(lambda x: len(x.split('.')))
+            
+            # essay paragraph count
+            data["paragraph_count"] = data["full_text"].apply(lambda x: len(x.split('\n\n')))
         
         # count misspelling
-        data["splling_err_num"] = data["processed_text"].apply(self.spelling)
-        print("Spelling mistake count done")
+        with measure('Preprocessor.spelling', len(data)):
+            data["splling_err_num"] = self.spell_cache.count_unknown_batch(data["processed_text"])
         
         return data
+
+
+# Preprocessor built once in every worker process of Preprocessor.run(n_jobs=N)
+_WORKER = None
+
+def _init_worker(profile):
+    global _WORKER
+    init_worker(profile)
+    _WORKER = Preprocessor()
+    # Load the punkt tokenizer once instead of on the first essay
+    word_tokenize("warm up")
+
+def _run_chunk(chunk):
+    # The worker's stage stats go back with the chunk; run() merges them
+    return _WORKER._run_steps(chunk.copy()), drain()
+
 # Example usage    
 # preprocessor = Preprocessor()
 # tmp = preprocessor.run(train.to_pandas(), mode="train")
+# tmp = preprocessor.run(train.to_pandas(), mode="train", n_jobs=32)
 # train_feats = train_feats.merge(tmp, on='essay_id', how='left')
 # feature_names = list(filter(lambda x: x not in ['essay_id','score'], train_feats.columns))
 # print('Features Number: ',len(feature_names))
@@ -0,0 +1,237 @@
+"""Long-lived, low-latency essay scoring on top of lgbm_model.pkl.
+
+The model and the fitted TF-IDF vectorizers are loaded once. Every request is
+turned into features with Essay_features (plain Python, no DataFrames), the
+TF-IDF rows are scattered straight into a NumPy matrix laid out in the model's
+feature order, and the booster predicts on that matrix. Concurrent requests are
+grouped by MicroBatcher so that one predict call serves many essays.
+
+Usage:
+    python Scoring_service.py --http 8000      # POST {"full_text": ...} or {"essays": [...]} to /score
+    python Scoring_service.py < essays.jsonl   # one {"essay_id", "full_text"} object per line
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from artifacts import ARTIFACTS, load_artifact, load_model
+from Essay_features import essay_features
+from feature_engineering import dataPreprocessing_w_contract_punct_remove
+from Preprocessor import Preprocessor
+from qwk import QWK_A, to_scores
+
+
+class EssayScorer:
+    """Scores essays with the saved LightGBM model and fitted vectorizer artifacts.
+
+    Args:
+        model_path (str): joblib file with the LGBMRegressor (or Booster).
+        tfidf_path (str): Fitted Vectorization vectorizer, None to skip the tfid_* block.
+        word_tfidf_path (str): Fitted Word_vectorizer vectorizer, None to skip the tfid_w_* block.
+    """
+
+    def __init__(self, model_path=ARTIFACTS.model_path, tfidf_path=ARTIFACTS.tfidf_path,
+                 word_tfidf_path=ARTIFACTS.word_tfidf_path):
+        model = load_model(model_path)
+        self.booster = getattr(model, 'booster_', model)
+        self.feature_names = self.booster.feature_name()
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+        self.spell_cache = Preprocessor().spell_cache
+        # (vectorizer, model column of every vectorizer column or -1, uses processed text)
+        self.blocks = []
+        for path, prefix, processed in ((tfidf_path, 'tfid_', False), (word_tfidf_path, 'tfid_w_', True)):
+            if path is None:
+                continue
+            vectorizer = load_artifact(path)
+            n_columns = len(vectorizer.get_feature_names_out())
+            columns = np.array([self.index.get(f'{prefix}{i}', -1) for i in range(n_columns)])
+            self.blocks.append((vectorizer, columns, processed))
+
+    def features(self, texts):
+        """Feature matrix of a micro-batch, in the model's feature order (missing = NaN)."""
+        X = np.full((len(texts), len(self.feature_names)), np.nan)
+        processed = [dataPreprocessing_w_contract_punct_remove(t) for t in texts]
+        for row, (text, processed_text) in enumerate(zip(texts, processed)):
+            for name, value in essay_features(text, self.spell_cache, processed_text).items():
+                column = self.index.get(name)
+                if column is not None:
+                    X[row, column] = value
+        for vectorizer, columns, use_processed in self.blocks:
+            # TF-IDF columns are dense zeros in training, not missing
+            X[:, columns[columns >= 0]] = 0.0
+            block = vectorizer.transform(processed if use_processed else texts).tocoo()
+            target = columns[block.col]
+            keep = target >= 0
+            X[block.row[keep], target[keep]] = block.data[keep]
+        return X
+
+    def predict(self, texts):
+        """Raw regression output on the 1-6 score scale."""
+        return self.booster.predict(self.features(texts)) + QWK_A
+
+    def score(self, texts):
+        """Integer scores in [1, 6]."""
+        return to_scores(self.predict(texts)).tolist()
+
+
+class MicroBatcher:
+    """Groups concurrent score requests into micro-batches on a background thread.
+
+    A batch is flushed when it holds max_batch essays or when the oldest request
+    has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, scorer, max_batch=32, max_wait_ms=2.0, latency_window=10_000):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.latencies = deque(maxlen=latency_window)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """Queue one essay; returns a Future resolving to its score."""
+        future = Future()
+        self.queue.put((text, future, time.perf_counter()))
+        return future
+
+    def score(self, texts):
+        """Blocking helper: submit every text and wait for all of them."""
+        return [f.result() for f in [self.submit(t) for t in texts]]
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            scores = self.scorer.score([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        done = time.perf_counter()
+        for (_, future, start), score in zip(batch, scores):
+            self.latencies.append(done - start)
+            future.set_result(score)
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Request latency percentiles in milliseconds over the recent window."""
+        if not self.latencies:
+            return {}
+        values = np.percentile(np.array(self.latencies) * 1000, percentiles)
+        return {f'p{p}': float(v) for p, v in zip(percentiles, values)}
+
+
+def make_server(batcher, host='127.0.0.1', port=8000):
+    """HTTP server for POST /score with {"full_text": ...} or {"essays": [{"essay_id", "full_text"}, ...]}; GET /stats.
+
+    Malformed requests are answered with 400, essays the model fails to score with 500.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/stats':
+                return self._reply(404, {'error': 'not found'})
+            self._reply(200, batcher.latency_percentiles())
+
+        def do_POST(self):
+            if self.path != '/score':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                essays = request['essays'] if 'essays' in request else [request]
+                texts = [e['full_text'] for e in essays]
+                if not all(isinstance(text, str) for text in texts):
+                    raise TypeError('full_text must be a string')
+            except (KeyError, TypeError, ValueError) as e:
+                return self._reply(400, {'error': str(e)})
+            try:
+                scores = batcher.score(texts)
+            except Exception as e:
+                return self._reply(500, {'error': f'scoring failed: {e}'})
+            results = [{'essay_id': e.get('essay_id'), 'score': s} for e, s in zip(essays, scores)]
+            self._reply(200, results if 'essays' in request else results[0])
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve_http(batcher, host='127.0.0.1', port=8000):
+    """Serve make_server(batcher, host, port) until interrupted."""
+    make_server(batcher, host, port).serve_forever()
+
+
+def serve_stdin(batcher, stdin=sys.stdin, stdout=sys.stdout):
+    """Score one {"essay_id", "full_text"} JSON object per input line."""
+    for line in stdin:
+        if not line.strip():
+            continue
+        essay = json.loads(line)
+        score = batcher.submit(essay['full_text']).result()
+        stdout.write(json.dumps({'essay_id': essay.get('essay_id'), 'score': score}) + '\n')
+        stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score essays with the saved LightGBM model.')
+    parser.add_argument('--http', type=int, metavar='PORT', help='serve HTTP on PORT instead of reading stdin')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--model', default=ARTIFACTS.model_path)
+    parser.add_argument('--tfidf', default=ARTIFACTS.tfidf_path)
+    parser.add_argument('--word-tfidf', default=ARTIFACTS.word_tfidf_path)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    batcher = MicroBatcher(EssayScorer(args.model, args.tfidf, args.word_tfidf), args.max_batch, args.max_wait_ms)
+    if args.http:
+        serve_http(batcher, args.host, args.http)
+    else:
+        serve_stdin(batcher)
+    batcher.close()
+
+
+if __name__ == '__main__':
+    main()
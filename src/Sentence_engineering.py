@@ -1,19 +1,41 @@
 import polars as pl
 from feature_engineering import dataPreprocessing
+from Paragraph_engineering import normalize_expr
+from Instrumentation import stage
 
-def Sentence_Preprocess(tmp):
+def sentence_measures(tmp):
+    """Native part of Sentence_Preprocess starting from the 'sentence' list column.
+    Usable on a DataFrame or a LazyFrame."""
+    tmp = tmp.explode('sentence')
+    # Calculate the length of a sentence
+    tmp = tmp.with_columns(pl.col('sentence').str.len_chars().cast(pl.Int64).alias("sentence_len"))
+    # Filter out the portion of data with a sentence length greater than 15
+    tmp = tmp.filter(pl.col('sentence_len')>=15)
+    # Count the number of words in each sentence
+    return tmp.with_columns((pl.col('sentence').str.count_matches(' ', literal=True).cast(pl.Int64) + 1).alias("sentence_word_cnt"))
+
+@stage()
+def Sentence_Preprocess(tmp, native=True):
     """This function takes a DataFrame as input, which likely contains the preprocessed data from essays.
     
-        - It preprocesses the 'full_text' column using dataPreprocessing (not defined in the provided code) and splits the text into sentences using periods as separators.
+        - It preprocesses the 'full_text' column using dataPreprocessing from feature_engineering and splits the text into sentences using periods as separators.
         - It calculates the length of each sentence (sentence_len) and the number of words in each sentence (sentence_word_cnt).
         - It filters out sentences with a length less than 15 characters.
 
+    With native=True the measures are built from native `str` expressions and the
+    preprocessing runs as one batch UDF; native=False keeps the map_elements path.
+
     Args:
         tmp (_type_): DataFrame
+        native (bool): Use native Polars expressions.
 
     Returns:
         tmp _type_: DataFrame
     """
+    if native:
+        # Preprocess full_text and use periods to segment sentences in the text
+        tmp = tmp.with_columns(normalize_expr('full_text').str.split(by=".").alias("sentence"))
+        return sentence_measures(tmp)
     # Preprocess full_text and use periods to segment sentences in the text
     tmp = tmp.with_columns(pl.col('full_text').map_elements(dataPreprocessing).str.split(by=".").alias("sentence"))
     tmp = tmp.explode('sentence')
@@ -26,7 +48,27 @@ def Sentence_Preprocess(tmp):
     return tmp
 
 sentence_fea = ['sentence_len','sentence_word_cnt']
+# sentence_{i}_cnt thresholds: sentences at least i characters long
+sentence_ge = [15,50,100,150,200,250,300]
+
+def sentence_aggs():
+    """Per-essay aggregations used by Sentence_Eng and the lazy feature plan."""
+    return [
+        # Count the number of sentences with a length greater than i
+        *[pl.col('sentence').filter(pl.col('sentence_len') >= i).count().alias(f"sentence_{i}_cnt") for i in sentence_ge], 
+        # other
+        *[pl.col(fea).max().alias(f"{fea}_max") for fea in sentence_fea],
+        *[pl.col(fea).mean().alias(f"{fea}_mean") for fea in sentence_fea],
+        *[pl.col(fea).min().alias(f"{fea}_min") for fea in sentence_fea],
+        *[pl.col(fea).first().alias(f"{fea}_first") for fea in sentence_fea],
+        *[pl.col(fea).last().alias(f"{fea}_last") for fea in sentence_fea],
+        *[pl.col(fea).sum().alias(f"{fea}_sum") for fea in sentence_fea],
+        *[pl.col(fea).kurtosis().alias(f"{fea}_kurtosis") for fea in sentence_fea],
+        *[pl.col(fea).quantile(0.25).alias(f"{fea}_q1") for fea in sentence_fea], 
+        *[pl.col(fea).quantile(0.75).alias(f"{fea}_q3") for fea in sentence_fea], 
+        ]
 
+@stage()
 def Sentence_Eng(train_tmp):
     """This function takes a DataFrame as input, presumably the output of Sentence_Preprocess.
         - It performs feature engineering on the sentences, counting the number of sentences with lengths greater than certain thresholds (sentence_{i}_cnt).
@@ -40,20 +82,6 @@ def Sentence_Eng(train_tmp):
     Returns:
         df _type_: DataFrame
     """
-    aggs = [
-        # Count the number of sentences with a length greater than i
-        *[pl.col('sentence').filter(pl.col('sentence_len') >= i).count().alias(f"sentence_{i}_cnt") for i in [15,50,100,150,200,250,300] ], 
-        # other
-        *[pl.col(fea).max().alias(f"{fea}_max") for fea in sentence_fea],
-        *[pl.col(fea).mean().alias(f"{fea}_mean") for fea in sentence_fea],
-        *[pl.col(fea).min().alias(f"{fea}_min") for fea in sentence_fea],
-        *[pl.col(fea).first().alias(f"{fea}_first") for fea in sentence_fea],
-        *[pl.col(fea).last().alias(f"{fea}_last") for fea in sentence_fea],
-        *[pl.col(fea).sum().alias(f"{fea}_sum") for fea in sentence_fea],
-        *[pl.col(fea).kurtosis().alias(f"{fea}_kurtosis") for fea in sentence_fea],
-        *[pl.col(fea).quantile(0.25).alias(f"{fea}_q1") for fea in sentence_fea], 
-        *[pl.col(fea).quantile(0.75).alias(f"{fea}_q3") for fea in sentence_fea], 
-        ]
-    df = train_tmp.group_by(['essay_id'], maintain_order=True).agg(aggs).sort("essay_id")
+    df = train_tmp.group_by(['essay_id'], maintain_order=True).agg(sentence_aggs()).sort("essay_id")
     df = df.to_pandas()
     return df
@@ -0,0 +1,74 @@
+"""Sparse feature assembly for the TF-IDF blocks.
+
+The TF-IDF matrices stay in CSR form and are stacked horizontally next to the
+dense handcrafted features, with the column names kept in a side list. The
+result can be passed straight to LightGBM, so memory scales with the number of
+nonzeros instead of essays x vocabulary.
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class SparseBlock(NamedTuple):
+    """A CSR feature block with its column names and the essay_id of every row."""
+    matrix: sp.csr_matrix
+    columns: List[str]
+    essay_id: np.ndarray
+
+
+def align_block(block, essay_id):
+    """Reorder the rows of a block to follow essay_id.
+
+    Essays that are missing from the block get an empty (all-zero) row.
+
+    Args:
+        block (SparseBlock): Block to align.
+        essay_id (_type_): Target row order.
+
+    Returns:
+        sp.csr_matrix: Aligned matrix with len(essay_id) rows
+    """
+    positions = pd.Index(np.asarray(block.essay_id)).get_indexer(np.asarray(essay_id))
+    if np.array_equal(positions, np.arange(block.matrix.shape[0])):
+        return block.matrix
+    found = positions >= 0
+    # Row selection matrix: one nonzero per essay that exists in the block
+    selector = sp.csr_matrix(
+        (np.ones(found.sum(), dtype=block.matrix.dtype), (np.flatnonzero(found), positions[found])),
+        shape=(len(positions), block.matrix.shape[0]),
+    )
+    return (selector @ block.matrix).tocsr()
+
+
+def assemble_sparse_features(train_feats, blocks, exclude=('essay_id', 'score'), dtype=np.float32):
+    """Horizontally stack the dense handcrafted features with sparse blocks.
+
+    Args:
+        train_feats (_type_): pandas DataFrame of handcrafted features with an 'essay_id' column.
+            Non-numeric columns and the columns in exclude are skipped.
+        blocks (list): SparseBlock objects, e.g. from Generate_tfidf_sparse.
+        exclude (tuple): Columns that are not features.
+        dtype (_type_): dtype of the assembled matrix.
+
+    Returns:
+        X: sp.csr_matrix with one row per train_feats row
+        feature_names: list of column names, in column order
+    """
+    dense = train_feats.drop(columns=[c for c in exclude if c in train_feats.columns]).select_dtypes('number')
+    feature_names = list(dense.columns)
+    parts = [sp.csr_matrix(dense.to_numpy(dtype=dtype))]
+    for block in blocks:
+        parts.append(align_block(block, train_feats['essay_id']))
+        feature_names.extend(block.columns)
+    X = sp.hstack(parts, format='csr', dtype=dtype)
+    return X, feature_names
+
+# Example usage
+# tfidf = Generate_tfidf_sparse(train)
+# tfidf_w = generate_tfidf_sparse_with_stopwords(train)
+# X, feature_names = assemble_sparse_features(train_feats, [tfidf, tfidf_w])
+# model.fit(X, train_feats['score'] - a, feature_name=feature_names)
@@ -0,0 +1,124 @@
+"""Reproducible synthetic essays for benchmarks.
+
+Words are drawn from the most frequent words of the SpellChecker English
+dictionary with their corpus frequencies, so the vocabulary follows the usual
+Zipf curve. Paragraph, sentence and word counts follow distributions roughly
+matching the competition essays (about 5 paragraphs of 4 sentences of 17
+words). A small share of the words is misspelled with a single edit, and some
+contractions, commas and digits are mixed in so that every normalizer and
+spelling step has work to do. The score grows with essay length, plus noise.
+The same (n, seed) always gives the same essays.
+"""
+
+import heapq
+import os
+import string
+
+import numpy as np
+import polars as pl
+from spellchecker import SpellChecker
+
+VOCABULARY_SIZE = 5000
+CONTRACTIONS = ["don't", "can't", "it's", "i'm", "they're", "won't", "isn't", "you're", "didn't", "that's"]
+
+
+class EssayGenerator:
+    """Generates synthetic essays with a fixed vocabulary and seeded randomness.
+
+    Args:
+        seed (int): Seed of the random generator.
+        misspelling_rate (float): Share of the words that get a spelling error.
+        contraction_rate (float): Share of the words replaced by a contraction.
+    """
+
+    def __init__(self, seed=0, misspelling_rate=0.03, contraction_rate=0.01):
+        frequency = SpellChecker().word_frequency.dictionary
+        # Sorted by count, then by word, so the vocabulary does not depend on dict order
+        top = heapq.nlargest(VOCABULARY_SIZE, frequency.items(), key=lambda item: (item[1], item[0]))
+        self.words = np.array([w for w, _ in top], dtype=object)
+        counts = np.array([c for _, c in top], dtype=np.float64)
+        self.cdf = np.cumsum(counts) / counts.sum()
+        self.rng = np.random.default_rng(seed)
+        self.misspelling_rate = misspelling_rate
+        self.contraction_rate = contraction_rate
+
+    def misspell(self, word):
+        """Apply one random edit: delete, swap, duplicate or replace a letter."""
+        if len(word) < 3:
+            return word
+        i = int(self.rng.integers(1, len(word) - 1))
+        edit = self.rng.integers(4)
+        if edit == 0:
+            return word[:i] + word[i + 1:]
+        if edit == 1:
+            return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+        if edit == 2:
+            return word[:i] + word[i] + word[i:]
+        return word[:i] + string.ascii_lowercase[self.rng.integers(26)] + word[i + 1:]
+
+    def words_of(self, n_words):
+        """n_words tokens with misspellings, contractions and the odd number mixed in."""
+        index = np.minimum(np.searchsorted(self.cdf, self.rng.random(n_words)), len(self.words) - 1)
+        words = self.words[index].tolist()
+        roll = self.rng.random(n_words)
+        for i in np.flatnonzero(roll < self.misspelling_rate):
+            words[i] = self.misspell(words[i])
+        for i in np.flatnonzero(roll > 1 - self.contraction_rate):
+            words[i] = CONTRACTIONS[self.rng.integers(len(CONTRACTIONS))]
+        for i in np.flatnonzero(self.rng.random(n_words) < 0.002):
+            words[i] = str(self.rng.integers(1, 100))
+        return words
+
+    def essay(self):
+        """One essay text and its word count."""
+        n_paragraphs = max(1, int(self.rng.normal(5, 1.5)))
+        sentences_per_paragraph = np.maximum(1, self.rng.poisson(4, n_paragraphs))
+        sentence_lengths = np.clip(self.rng.lognormal(2.75, 0.45, sentences_per_paragraph.sum()), 3, 80).astype(int)
+        words = self.words_of(int(sentence_lengths.sum()))
+        paragraphs, start, k = [], 0, 0
+        for n_sentences in sentences_per_paragraph:
+            sentences = []
+            for length in sentence_lengths[k:k + n_sentences]:
+                sentence = words[start:start + length]
+                start += length
+                if length > 8 and self.rng.random() < 0.4:
+                    comma = int(self.rng.integers(2, length - 2))
+                    sentence[comma] += ','
+                sentence[0] = sentence[0].capitalize()
+                sentences.append(' '.join(sentence) + '.')
+            k += n_sentences
+            paragraphs.append(' '.join(sentences))
+        return '\n\n'.join(paragraphs), len(words)
+
+    def generate(self, n):
+        """DataFrame of n essays with 'essay_id', 'full_text' and 'score'."""
+        texts, lengths = zip(*(self.essay() for _ in range(n))) if n else ((), ())
+        lengths = np.asarray(lengths, dtype=np.float64)
+        # Longer essays score higher, as in the real data
+        score = 3 + (lengths - 280) / 110 + self.rng.normal(0, 0.7, n)
+        return pl.DataFrame({
+            'essay_id': [f'{i:07x}' for i in range(n)],
+            'full_text': list(texts),
+            'score': np.clip(np.rint(score), 1, 6).astype(np.int64),
+        })
+
+
+def generate_essays(n, seed=0, misspelling_rate=0.03):
+    """n synthetic essays as a Polars DataFrame (see EssayGenerator)."""
+    return EssayGenerator(seed, misspelling_rate).generate(n)
+
+
+def load_essays(n, seed=0, cache_dir='data/bench'):
+    """generate_essays(n, seed), cached as Parquet so that large sizes are generated only once."""
+    path = os.path.join(cache_dir, f'essays_{n}_{seed}.parquet')
+    if os.path.exists(path):
+        return pl.read_parquet(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    essays = generate_essays(n, seed)
+    essays.write_parquet(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return essays
+
+# Example usage
+# train = generate_essays(10_000, seed=0)
+# train = load_essays(1_000_000)
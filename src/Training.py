@@ -0,0 +1,148 @@
+"""Cross-validated LightGBM training with the QWK objective.
+
+The LightGBM Dataset is binned once for the whole training set and saved as a
+binary file. Every fold loads that file and takes `subset` views for its train
+and validation rows, so the feature binning is never redone. Folds run
+concurrently in a process pool with a per-process thread cap, and the per-fold
+models and out-of-fold predictions are written to `out_dir`.
+"""
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+import scipy.sparse as sp
+from sklearn.model_selection import StratifiedKFold
+
+from qwk import QWK_A, QWKMetric, QWKObjective, quadratic_weighted_kappa, to_scores
+
+class CFG:
+    n_splits = 5
+    seed = 42
+    num_labels = 6
+
+# Parameters of the notebook's LGBMRegressor, in lgb.train form
+PARAMS = {
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'num_leaves': 10,
+    'feature_fraction': 0.5,
+    'lambda_l1': 0.1,
+    'lambda_l2': 0.8,
+    'metric': 'None',
+    'seed': CFG.seed,
+    'verbosity': -1,
+}
+NUM_BOOST_ROUND = 1024
+
+def make_folds(y, n_splits=CFG.n_splits, seed=CFG.seed):
+    """Fold number of every row, stratified on the score."""
+    folds = np.empty(len(y), dtype=np.int32)
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    for i, (_, val_index) in enumerate(skf.split(np.zeros(len(y)), y)):
+        folds[val_index] = i
+    return folds
+
+def _fingerprint(X, y, feature_names, categorical_feature='auto'):
+    h = hashlib.blake2b(digest_size=8)
+    # ravel(order='K') is a view of C- and F-ordered (FeatureMatrix) arrays alike
+    for part in ((X.data, X.indices, X.indptr) if sp.issparse(X) else (np.ravel(X, order='K'),)):
+        h.update(np.ascontiguousarray(part).data)
+    h.update(np.ascontiguousarray(y).data)
+    h.update(repr((X.shape, list(feature_names), categorical_feature)).encode('utf-8'))
+    return h.hexdigest()
+
+def build_dataset(X, y, feature_names, out_dir='models', categorical_feature='auto'):
+    """Bin X once and save it as a LightGBM binary Dataset.
+
+    The file name carries a fingerprint of X, y and the feature names, so an
+    unchanged training set is not binned again by a later run.
+
+    Returns:
+        str: Path of the binary Dataset
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f'train_{_fingerprint(X, y, feature_names, categorical_feature)}.bin')
+    if not os.path.exists(path):
+        dataset = lgb.Dataset(X, label=np.asarray(y) - QWK_A, feature_name=list(feature_names),
+                              categorical_feature=categorical_feature,
+                              params={'verbosity': -1}, free_raw_data=True)
+        dataset.construct().save_binary(path)
+    return path
+
+# Raw features, folds and binary Dataset path shipped once to every worker by _init_worker
+_WORKER = None
+
+def _init_worker(X, folds, dataset_path):
+    global _WORKER
+    _WORKER = (X, folds, dataset_path)
+
+def _train_fold(fold, params, num_threads, out_dir):
+    X, folds, dataset_path = _WORKER
+    params = {**params, 'objective': QWKObjective(), 'num_threads': num_threads}
+    full = lgb.Dataset(dataset_path, params={'verbosity': -1})
+    train_idx = np.flatnonzero(folds != fold)
+    valid_idx = np.flatnonzero(folds == fold)
+    train_set = full.subset(train_idx)
+    valid_set = full.subset(valid_idx)
+    print('\nFold_{} Training ================================\n'.format(fold+1))
+    booster = lgb.train(
+        params, train_set, num_boost_round=NUM_BOOST_ROUND,
+        valid_sets=[valid_set], valid_names=['valid'],
+        feval=QWKMetric(),
+        callbacks=[
+            lgb.log_evaluation(period=25),
+            lgb.early_stopping(stopping_rounds=75, first_metric_only=True),
+        ],
+    )
+    model_path = os.path.join(out_dir, f'fold_{fold}.txt')
+    booster.save_model(model_path)
+    return fold, model_path, valid_idx, booster.predict(X[valid_idx]) + QWK_A
+
+def train_folds(X, y, feature_names, folds=None, params=PARAMS, n_jobs=CFG.n_splits,
+                threads_per_job=None, out_dir='models', categorical_feature='auto'):
+    """Train one model per fold, folds running concurrently.
+
+    Args:
+        X (_type_): Feature matrix (NumPy array, FeatureMatrix.X or CSR), rows aligned with y.
+        y (_type_): Scores on the 1-6 scale.
+        feature_names (list): Column names of X.
+        folds (_type_): Fold number of every row, defaults to make_folds(y).
+        params (dict): lgb.train parameters; objective and num_threads are set per fold.
+        n_jobs (int): Folds trained at the same time.
+        threads_per_job (int): LightGBM threads per fold, defaults to cpu_count // n_jobs.
+        out_dir (str): Where the binary Dataset, fold_<k>.txt models and oof.npy go.
+        categorical_feature (_type_): Categorical column names, e.g. FeatureMatrix.categorical_features.
+
+    Returns:
+        models: list of lgb.Booster, one per fold
+        oof: out-of-fold predictions on the 1-6 scale
+    """
+    y = np.asarray(y)
+    folds = make_folds(y) if folds is None else np.asarray(folds)
+    threads_per_job = threads_per_job or max(1, (os.cpu_count() or 1) // n_jobs)
+    dataset_path = build_dataset(X, y, feature_names, out_dir, categorical_feature)
+    n_folds = int(folds.max()) + 1
+
+    oof = np.zeros(len(y))
+    model_paths = [None] * n_folds
+    # Spawned, not forked: forking after Polars has started its thread pool can deadlock
+    with ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+                             initargs=(X, folds, dataset_path)) as executor:
+        jobs = [executor.submit(_train_fold, fold, params, threads_per_job, out_dir) for fold in range(n_folds)]
+        for job in jobs:
+            fold, model_path, valid_idx, pred = job.result()
+            model_paths[fold] = model_path
+            oof[valid_idx] = pred
+    np.save(os.path.join(out_dir, 'oof.npy'), oof)
+
+    v_score = quadratic_weighted_kappa(y, to_scores(oof))
+    print(f"Validation score : {v_score}")
+    return [lgb.Booster(model_file=path) for path in model_paths], oof
+
+# Example usage
+# X, feature_names = assemble_sparse_features(train_feats, [tfidf, tfidf_w])
+# models, oof = train_folds(X, train_feats['score'], feature_names, n_jobs=5, threads_per_job=6)
@@ -4,15 +4,45 @@ and then merges the TF-IDF features with the previously generated features from
 
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
+from Sparse_features import SparseBlock
+from Instrumentation import stage
 
-def Generate_tfidf_features(train, train_feats):
+
+def identity(x):
+    """Module-level identity function so that a fitted vectorizer can be pickled."""
+    return x
+
+
+def make_tfidf_vectorizer():
+    """TF-IDF vectorizer over the raw 'full_text' used by Generate_tfidf_features."""
+    return TfidfVectorizer(
+        tokenizer=identity,
+        preprocessor=identity,
+        token_pattern=None,
+        strip_accents='unicode',
+        analyzer='word',
+        ngram_range=(1, 3),
+        min_df=0.05,
+        max_df=0.95,
+        sublinear_tf=True,
+    )
+
+
+@stage()
+def fit_tfidf_vectorizer(train):
+    """Fit the TF-IDF vectorizer once on the training 'full_text'; save it with artifacts.save_artifact."""
+    return make_tfidf_vectorizer().fit([i for i in train['full_text']])
+
+
+@stage()
+def Generate_tfidf_features(train, train_feats, vectorizer=None):
     """
     This code snippet performs text vectorization using TF-IDF (Term Frequency-Inverse Document Frequency) and then merges the TF-IDF features with the previously generated features from paragraphs and sentences. Let's break down each part:
 
     1. **`TfidfVectorizer` Initialization**:
     - The `TfidfVectorizer` is initialized with several parameters:
-        - `tokenizer=lambda x: x`: This parameter specifies that the tokenizer function should be the identity function, meaning it doesn't tokenize the input text further and treats each input as a single token.
-        - `preprocessor=lambda x: x`: Similarly, the preprocessor function is set to the identity function, meaning no additional preprocessing is applied before tokenization.
+        - `tokenizer=identity`: This parameter specifies that the tokenizer function should be the identity function, meaning it doesn't tokenize the input text further and treats each input as a single token.
+        - `preprocessor=identity`: Similarly, the preprocessor function is set to the identity function, meaning no additional preprocessing is applied before tokenization.
         - `token_pattern=None`: This parameter overrides the default token pattern used by the vectorizer, effectively disabling tokenization based on patterns.
         - `strip_accents='unicode'`: It specifies that accents should be stripped using Unicode normalization.
         - `analyzer='word'`: This parameter indicates that the analyzer should treat each token as a word.
@@ -36,30 +66,27 @@ def Generate_tfidf_features(train, train_feats):
 
     Overall, this code combines TF-IDF vectorization with the existing feature engineering pipeline to enrich the feature set for further analysis or machine learning tasks, particularly in the context of text data (essays in this case).
 
+    When a fitted `vectorizer` is given (see fit_tfidf_vectorizer and artifacts.load_artifact) it is only
+    used to transform, which keeps the test columns identical to the training columns.
+
     Args:
         train (_type_): Dataframe
         train_feats (_type_): Dataframe
+        vectorizer (_type_): Optional fitted TfidfVectorizer
         
     Returns:
         train_feats: Dataframe
         feature_names: Dataframe
     """
     
-    # Initialize TF-IDF Vectorizer
-    vectorizer = TfidfVectorizer(
-        tokenizer=lambda x: x,
-        preprocessor=lambda x: x,
-        token_pattern=None,
-        strip_accents='unicode',
-        analyzer='word',
-        ngram_range=(1, 3),
-        min_df=0.05,
-        max_df=0.95,
-        sublinear_tf=True,
-    )
-
-    # Fit and transform the 'full_text' column from the train DataFrame
-    train_tfid = vectorizer.fit_transform([i for i in train['full_text']])
+    if vectorizer is None:
+        # Initialize TF-IDF Vectorizer
+        vectorizer = make_tfidf_vectorizer()
+        # Fit and transform the 'full_text' column from the train DataFrame
+        train_tfid = vectorizer.fit_transform([i for i in train['full_text']])
+    else:
+        # Transform only with the already fitted vocabulary
+        train_tfid = vectorizer.transform([i for i in train['full_text']])
 
     # Extract feature names from the TF-IDF vectorizer
     print("#"*80)
@@ -87,3 +114,25 @@ def Generate_tfidf_features(train, train_feats):
     feature_names = list(filter(lambda x: x not in ['essay_id', 'score'], train_feats.columns))
 
     return train_feats, feature_names
+
+
+@stage()
+def Generate_tfidf_sparse(train, vectorizer=None):
+    """Sparse variant of Generate_tfidf_features.
+
+    The TF-IDF matrix is kept in CSR form instead of being densified and merged;
+    combine it with the other features using Sparse_features.assemble_sparse_features.
+
+    Args:
+        train (_type_): Dataframe with 'essay_id' and 'full_text'
+        vectorizer (_type_): Optional fitted TfidfVectorizer, used for transform only
+
+    Returns:
+        SparseBlock: CSR matrix, 'tfid_i' column names and the essay_id of every row
+    """
+    if vectorizer is None:
+        train_tfid = make_tfidf_vectorizer().fit_transform([i for i in train['full_text']])
+    else:
+        train_tfid = vectorizer.transform([i for i in train['full_text']])
+    tfid_columns = [f'tfid_{i}' for i in range(train_tfid.shape[1])]
+    return SparseBlock(train_tfid.tocsr(), tfid_columns, train['essay_id'].to_numpy())
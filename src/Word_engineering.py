@@ -0,0 +1,62 @@
+import polars as pl
+from Paragraph_engineering import normalize_expr
+from Instrumentation import stage
+
+def word_measures(tmp):
+    """Native part of Word_Preprocess starting from the 'word' list column.
+    Usable on a DataFrame or a LazyFrame."""
+    tmp = tmp.explode('word')
+    # Calculate the length of each word
+    tmp = tmp.with_columns(pl.col('word').str.len_chars().cast(pl.Int64).alias("word_len"))
+    # Delete data with a word length of 0
+    return tmp.filter(pl.col('word_len')!=0)
+
+@stage()
+def Word_Preprocess(tmp):
+    """This function takes a DataFrame as input and performs the following operations:-
+        - It preprocesses the 'full_text' column using dataPreprocessing from feature_engineering and splits the text into words using spaces as separators.
+        - It calculates the length of each word (word_len) and drops empty words.
+
+    Args:
+        tmp (_type_): DataFrame
+
+    Returns:
+        tmp _type_: DataFrame
+    """
+    # Preprocess full_text and use spaces to separate words from the text
+    tmp = tmp.with_columns(normalize_expr('full_text').str.split(by=" ").alias("word"))
+    return word_measures(tmp)
+
+# word_{i}_cnt thresholds: words at least i characters long
+word_ge = list(range(1, 16))
+
+def word_aggs():
+    """Per-essay aggregations used by Word_Eng and the lazy feature plan."""
+    return [
+        # Count the number of words with a length greater than i+1
+        *[pl.col('word').filter(pl.col('word_len') >= i).count().alias(f"word_{i}_cnt") for i in word_ge],
+        # other
+        pl.col('word_len').max().alias("word_len_max"),
+        pl.col('word_len').mean().alias("word_len_mean"),
+        pl.col('word_len').std().alias("word_len_std"),
+        pl.col('word_len').quantile(0.25).alias("word_len_q1"),
+        pl.col('word_len').quantile(0.50).alias("word_len_q2"),
+        pl.col('word_len').quantile(0.75).alias("word_len_q3"),
+        ]
+
+@stage()
+def Word_Eng(train_tmp):
+    """This function takes a DataFrame as input, presumably the output of Word_Preprocess.
+        - It counts the number of words with lengths greater than or equal to 1..15 (word_{i}_cnt).
+        - It calculates the maximum, mean, standard deviation and quartiles of the word length.
+        - Finally, it converts the resulting aggregated data back to a pandas DataFrame (df).
+
+    Args:
+        train_tmp (_type_): DataFrame
+
+    Returns:
+        df _type_: DataFrame
+    """
+    df = train_tmp.group_by(['essay_id'], maintain_order=True).agg(word_aggs()).sort("essay_id")
+    df = df.to_pandas()
+    return df
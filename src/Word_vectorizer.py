@@ -1,10 +1,33 @@
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from nltk.corpus import stopwords
-from src.feature_engineering import dataPreprocessing_w_contract_punct_remove
+from feature_engineering import normalize_batch
+from Sparse_features import SparseBlock
+from Instrumentation import stage
 
 
-def generate_tfidf_features_with_stopwords(df, train_df, min_df=0.05, max_df=0.95):
+def make_word_vectorizer(min_df=0.05, max_df=0.95):
+    """Unigram TF-IDF vectorizer with English stopwords removed."""
+    return TfidfVectorizer(
+        strip_accents='ascii',
+        analyzer='word',
+        ngram_range=(1, 1),
+        min_df=min_df,
+        max_df=max_df,
+        sublinear_tf=True,
+        stop_words=stopwords.words('english'),
+    )
+
+
+@stage()
+def fit_word_vectorizer(df, min_df=0.05, max_df=0.95):
+    """Fit the word TF-IDF vectorizer once on the training 'full_text'; save it with artifacts.save_artifact."""
+    processed_text = normalize_batch(df['full_text'], contract=True, punct_remove=True)
+    return make_word_vectorizer(min_df, max_df).fit(processed_text)
+
+
+@stage()
+def generate_tfidf_features_with_stopwords(df, train_df, min_df=0.05, max_df=0.95, word_vectorizer=None):
     """
     Generate TF-IDF features for text data with stopwords removed.
 
@@ -13,30 +36,22 @@ def generate_tfidf_features_with_stopwords(df, train_df, min_df=0.05, max_df=0.9
     - train_df: DataFrame containing additional information such as essay_id.
     - min_df: Minimum document frequency for words to be included in TF-IDF calculation (default: 0.05).
     - max_df: Maximum document frequency for words to be included in TF-IDF calculation (default: 0.95).
+    - word_vectorizer: Optional fitted vectorizer (see fit_word_vectorizer); when given it is only used to transform.
 
     Returns:
     - train_df_merged: Merged DataFrame containing TF-IDF features merged with train_df.
     - feature_names: List of feature names excluding 'essay_id', 'score', and 'full_text'.
     """
     
-    stopwords_list = stopwords.words('english')
-    
-    # Initialize TfidfVectorizer
-    word_vectorizer = TfidfVectorizer(
-        strip_accents='ascii',
-        analyzer='word',
-        ngram_range=(1, 1),
-        min_df=min_df,
-        max_df=max_df,
-        sublinear_tf=True,
-        stop_words=stopwords_list,
-    )
-    
     # Apply preprocessing to the text
-    processed_text = df['full_text'].apply(lambda x: dataPreprocessing_w_contract_punct_remove(x))
+    processed_text = normalize_batch(df['full_text'], contract=True, punct_remove=True)
     
-    # Fit all datasets into TfidfVector
-    train_tfid = word_vectorizer.fit_transform(processed_text)
+    if word_vectorizer is None:
+        # Fit all datasets into TfidfVector
+        train_tfid = make_word_vectorizer(min_df, max_df).fit_transform(processed_text)
+    else:
+        # Transform only with the training vocabulary
+        train_tfid = word_vectorizer.transform(processed_text)
 
     # Convert to array
     dense_matrix = train_tfid.toarray()
@@ -58,6 +73,29 @@ def generate_tfidf_features_with_stopwords(df, train_df, min_df=0.05, max_df=0.9
     return train_df_merged, feature_names
 
 
+@stage()
+def generate_tfidf_sparse_with_stopwords(df, min_df=0.05, max_df=0.95, word_vectorizer=None):
+    """
+    Sparse variant of generate_tfidf_features_with_stopwords.
+
+    Parameters:
+    - df: DataFrame containing 'essay_id' and 'full_text'.
+    - min_df: Minimum document frequency for words to be included in TF-IDF calculation (default: 0.05).
+    - max_df: Maximum document frequency for words to be included in TF-IDF calculation (default: 0.95).
+    - word_vectorizer: Optional fitted vectorizer, used for transform only.
+
+    Returns:
+    - SparseBlock with the CSR matrix, the 'tfid_w_i' column names and the essay_id of every row.
+    """
+    processed_text = normalize_batch(df['full_text'], contract=True, punct_remove=True)
+    if word_vectorizer is None:
+        train_tfid = make_word_vectorizer(min_df, max_df).fit_transform(processed_text)
+    else:
+        train_tfid = word_vectorizer.transform(processed_text)
+    tfid_w_columns = [f'tfid_w_{i}' for i in range(train_tfid.shape[1])]
+    return SparseBlock(train_tfid.tocsr(), tfid_w_columns, df['essay_id'].to_numpy())
+
+
 # Example usage
 # train_feats_with_stopwords, feature_names_with_stopwords = generate_tfidf_features_with_stopwords(train, train_feats)
 
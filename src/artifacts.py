@@ -0,0 +1,65 @@
+"""Versioned model and vectorizer artifacts stored next to lgbm_model.pkl.
+
+Vectorizers are fitted once on the training data and saved here; inference
+loads them and only calls transform, so train and test share one feature space.
+"""
+
+import joblib
+import sklearn
+from joblib.numpy_pickle import NumpyUnpickler
+from joblib.numpy_pickle_utils import _validate_fileobject_and_memmap
+
+from qwk import SklearnQWKMetric, SklearnQWKObjective
+
+ARTIFACT_VERSION = 1
+
+class ARTIFACTS:
+    model_path = 'lgbm_model.pkl'
+    tfidf_path = f'tfidf_vectorizer_v{ARTIFACT_VERSION}.pkl'
+    word_tfidf_path = f'word_tfidf_vectorizer_v{ARTIFACT_VERSION}.pkl'
+
+def save_artifact(obj, path):
+    """Pickle obj together with the artifact version and the scikit-learn version."""
+    joblib.dump({'version': ARTIFACT_VERSION, 'sklearn': sklearn.__version__, 'object': obj}, path)
+
+def load_artifact(path):
+    """Load an artifact written by save_artifact.
+
+    Raises:
+        ValueError: If the artifact was written by a different ARTIFACT_VERSION.
+    """
+    payload = joblib.load(path)
+    if payload['version'] != ARTIFACT_VERSION:
+        raise ValueError(f"{path} has artifact version {payload['version']}, expected {ARTIFACT_VERSION}")
+    return payload['object']
+
+# The notebook pickled its custom objective and metric by reference to __main__;
+# the qwk equivalents with the same (y_true, y_pred) signature stand in for them
+_NOTEBOOK_FUNCS = {'qwk_obj': SklearnQWKObjective, 'quadratic_weighted_kappa': SklearnQWKMetric}
+
+class _ModelUnpickler(NumpyUnpickler):
+    """joblib unpickler that resolves the notebook's __main__ functions without touching __main__.
+
+    Every load gets its own objective and metric instances, so loaded models
+    share no cached labels or buffers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.notebook_funcs = {name: cls() for name, cls in _NOTEBOOK_FUNCS.items()}
+
+    def find_class(self, module, name):
+        if module == '__main__' and name in self.notebook_funcs:
+            return self.notebook_funcs[name]
+        return super().find_class(module, name)
+
+def load_model(path=ARTIFACTS.model_path):
+    """Load the LightGBM model saved by the notebook with joblib.dump."""
+    with open(path, 'rb') as f:
+        with _validate_fileobject_and_memmap(f, path, None) as (fobj, _):
+            return _ModelUnpickler(path, fobj, ensure_native_byte_order=True).load()
+
+# Example usage
+# save_artifact(fit_tfidf_vectorizer(train), ARTIFACTS.tfidf_path)
+# save_artifact(fit_word_vectorizer(train), ARTIFACTS.word_tfidf_path)
+# test_feats, feature_names = Generate_tfidf_features(test, test_feats, vectorizer=load_artifact(ARTIFACTS.tfidf_path))
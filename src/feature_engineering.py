@@ -1,5 +1,6 @@
 import re
 import string
+from Instrumentation import stage
 
 # The 'removeHTML' function is used to remove HTML tags from a given text or string 'x'
 def removeHTML(x):
@@ -46,12 +47,70 @@ cList = {
     "y'all've": "you all have","you'd": "you had","you'd've": "you would have","you'll": "you you will","you'll've": "you you will have",
     "you're": "you are",  "you've": "you have"
 }
-c_re = re.compile('(%s)' % '|'.join(cList.keys()))
+class ContractionExpander:
+    """Leftmost-longest replacement of the contractions in a mapping, in one pass.
+
+    The keys are stored in a character trie. Every key contains an apostrophe,
+    so the text is only searched (with str.find) for apostrophes, and the trie
+    is walked from the few positions before each one that can start a key.
+    The work is linear in the text length. At each position the longest key
+    wins, e.g. "can't've" -> "cannot have" rather than "cannot've".
+
+    Args:
+        mapping (dict): Contraction -> expansion; every key must contain an apostrophe.
+    """
+    def __init__(self, mapping):
+        if not all("'" in key for key in mapping):
+            raise ValueError("Every contraction must contain an apostrophe")
+        self.trie = {}
+        for key, value in mapping.items():
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+            # '' cannot be a character, so it marks the end of a key
+            node[''] = value
+        # Largest offset of the first apostrophe within a key
+        self.reach = max((key.index("'") for key in mapping), default=0)
+
+    def _longest(self, text, start):
+        # (end, expansion) of the longest key starting at text[start], or None
+        node, found = self.trie, None
+        for end in range(start, len(text)):
+            node = node.get(text[end])
+            if node is None:
+                break
+            if '' in node:
+                found = (end + 1, node[''])
+        return found
+
+    def __call__(self, text):
+        quote = text.find("'")
+        if quote < 0:
+            return text
+        parts, done = [], 0
+        while quote >= 0:
+            start = max(done, quote - self.reach)
+            for start in range(start, quote + 1):
+                match = self._longest(text, start)
+                if match is not None:
+                    end, expansion = match
+                    parts.append(text[done:start])
+                    parts.append(expansion)
+                    done = end
+                    break
+            quote = text.find("'", max(done, quote + 1))
+        parts.append(text[done:])
+        return ''.join(parts)
+
+    def batch(self, texts):
+        """Expand every text of a list; None is passed through."""
+        return [None if text is None else self(text) for text in texts]
+
+
+CONTRACTIONS = ContractionExpander(cList)
 
 def expandContractions(text):
-    def replace(match):
-        return cList[match.group(0)]
-    return c_re.sub(replace, text)
+    return CONTRACTIONS(text)
 
 def remove_punctuation(text):
     """
@@ -67,90 +126,94 @@ def remove_punctuation(text):
     translator = str.maketrans('', '', string.punctuation)
     return text.translate(translator)
 
+class TextNormalizer:
+    """Precompiled text normalizer behind all the dataPreprocessing* variants.
+
+    The patterns are compiled once per process and the deletions of '@' handles,
+    "'"-prefixed numbers and bare numbers are fused into a single scan. HTML and URL
+    passes only run when the text can contain a match, whitespace is collapsed with
+    str.split, and runs of periods and commas are collapsed together in one pass.
+
+    Args:
+        contract (bool): Expand contractions with cList (see ContractionExpander).
+        punct_remove (bool): Remove all punctuation characters.
+    """
+    html_re = re.compile(r'<.*?>')
+    delete_re = re.compile(r"@\w+|'?\d+")
+    url_re = re.compile(r"http\w+")
+    repeat_re = re.compile(r"([.,])\1+")
+    punct_table = str.maketrans('', '', string.punctuation)
+
+    def __init__(self, contract=False, punct_remove=False):
+        self.contract = contract
+        self.punct_remove = punct_remove
+
+    def __call__(self, x):
+        # Convert words to lowercase
+        x = x.lower()
+        # Remove HTML
+        if '<' in x:
+            x = self.html_re.sub('', x)
+        # Delete strings starting with @ and numbers
+        x = self.delete_re.sub('', x)
+        # Delete URL
+        if 'http' in x:
+            x = self.url_re.sub('', x)
+        # Replace consecutive empty spaces with a single space character
+        x = ' '.join(x.split())
+        if self.contract:
+            x = expandContractions(x)
+        if self.punct_remove:
+            # Consecutive commas and periods disappear with the rest of the punctuation
+            x = x.translate(self.punct_table)
+        else:
+            # Replace consecutive commas and periods with one comma and period character
+            x = self.repeat_re.sub(r'\1', x)
+        # Remove empty characters at the beginning and end
+        return x.strip()
+
+    def batch(self, texts):
+        """Normalize a whole column of texts.
+
+        Args:
+            texts: list of str, pandas/polars Series or pyarrow Array/ChunkedArray.
+                Missing values are passed through as None.
+
+        Returns:
+            list: Normalized texts in input order.
+        """
+        if hasattr(texts, 'to_pylist'):
+            texts = texts.to_pylist()
+        elif hasattr(texts, 'to_list'):
+            texts = texts.to_list()
+        elif hasattr(texts, 'tolist'):
+            texts = texts.tolist()
+        normalize = self.__call__
+        return [None if x is None else normalize(x) for x in texts]
+
+
+NORMALIZERS = {
+    (contract, punct_remove): TextNormalizer(contract, punct_remove)
+    for contract in (False, True) for punct_remove in (False, True)
+}
+
+@stage()
+def normalize_batch(texts, contract=False, punct_remove=False):
+    """Batch API over the shared normalizers, see TextNormalizer.batch."""
+    return NORMALIZERS[(contract, punct_remove)].batch(texts)
+
+@stage()
 def dataPreprocessing(x):
-    # Convert words to lowercase
-    x = x.lower()
-    # Remove HTML
-    x = removeHTML(x)
-    # Delete strings starting with @
-    x = re.sub("@\w+", '',x)
-    # Delete Numbers
-    x = re.sub("'\d+", '',x)
-    x = re.sub("\d+", '',x)
-    # Delete URL
-    x = re.sub("http\w+", '',x)
-    # Replace consecutive empty spaces with a single space character
-    x = re.sub(r"\s+", " ", x)
-    # Replace consecutive commas and periods with one comma and period character
-    x = re.sub(r"\.+", ".", x)
-    x = re.sub(r"\,+", ",", x)
-    # Remove empty characters at the beginning and end
-    x = x.strip()
-    return x
+    return NORMALIZERS[(False, False)](x)
 
+@stage()
 def dataPreprocessing_w_contract(x):
-    # Convert words to lowercase
-    x = x.lower()
-    # Remove HTML
-    x = removeHTML(x)
-    # Delete strings starting with @
-    x = re.sub("@\w+", '',x)
-    # Delete Numbers
-    x = re.sub("'\d+", '',x)
-    x = re.sub("\d+", '',x)
-    # Delete URL
-    x = re.sub("http\w+", '',x)
-    # Replace consecutive empty spaces with a single space character
-    x = re.sub(r"\s+", " ", x)
-    x = expandContractions(x)
-    # Replace consecutive commas and periods with one comma and period character
-    x = re.sub(r"\.+", ".", x)
-    x = re.sub(r"\,+", ",", x)
-    # Remove empty characters at the beginning and end
-    x = x.strip()
-    return x
+    return NORMALIZERS[(True, False)](x)
 
+@stage()
 def dataPreprocessing_w_punct_remove(x):
-    # Convert words to lowercase
-    x = x.lower()
-    # Remove HTML
-    x = removeHTML(x)
-    # Delete strings starting with @
-    x = re.sub("@\w+", '',x)
-    # Delete Numbers
-    x = re.sub("'\d+", '',x)
-    x = re.sub("\d+", '',x)
-    # Delete URL
-    x = re.sub("http\w+", '',x)
-    # Replace consecutive empty spaces with a single space character
-    x = re.sub(r"\s+", " ", x)
-    # Replace consecutive commas and periods with one comma and period character
-    x = re.sub(r"\.+", ".", x)
-    x = re.sub(r"\,+", ",", x)
-    x = remove_punctuation(x)
-    # Remove empty characters at the beginning and end
-    x = x.strip()
-    return x
+    return NORMALIZERS[(False, True)](x)
 
+@stage()
 def dataPreprocessing_w_contract_punct_remove(x):
-    # Convert words to lowercase
-    x = x.lower()
-    # Remove HTML
-    x = removeHTML(x)
-    # Delete strings starting with @
-    x = re.sub("@\w+", '',x)
-    # Delete Numbers
-    x = re.sub("'\d+", '',x)
-    x = re.sub("\d+", '',x)
-    # Delete URL
-    x = re.sub("http\w+", '',x)
-    # Replace consecutive empty spaces with a single space character
-    x = re.sub(r"\s+", " ", x)
-    x = expandContractions(x)
-    # Replace consecutive commas and periods with one comma and period character
-    x = re.sub(r"\.+", ".", x)
-    x = re.sub(r"\,+", ",", x)
-    x = remove_punctuation(x)
-    # Remove empty characters at the beginning and end
-    x = x.strip()
-    return x
\ No newline at end of file
+    return NORMALIZERS[(True, True)](x)
@@ -1,9 +1,16 @@
+import json
+import os
+
 import pandas as pd
+import polars as pl
+import pyarrow.parquet as pq
 
 class PATHS:
     train_path = 'data/train.csv'
     test_path = 'data/test.csv'
     sub_path = 'data/sample_submission.csv'
+    # Columnar copies written once by convert_to_store
+    store_dir = 'data/store'
     
 def load_train():
     train = pd.read_csv(PATHS.train_path)
@@ -15,4 +22,146 @@ def load_test():
 
 def load_submission():
     submission = pd.read_csv(PATHS.sub_path)
-    return submission
\ No newline at end of file
+    return submission
+
+
+def iter_csv_chunks(path, chunksize=10_000, usecols=None):
+    """Read a CSV as an iterator of pandas DataFrames with at most chunksize rows."""
+    return pd.read_csv(path, chunksize=chunksize, usecols=usecols)
+
+def load_train_chunks(chunksize=10_000):
+    return iter_csv_chunks(PATHS.train_path, chunksize)
+
+def load_test_chunks(chunksize=10_000):
+    return iter_csv_chunks(PATHS.test_path, chunksize)
+
+
+def store_path(csv_path, fmt='parquet'):
+    """Path of the columnar copy of csv_path inside PATHS.store_dir."""
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(PATHS.store_dir, f'{name}.{"arrow" if fmt == "ipc" else "parquet"}')
+
+def _source_stamp(csv_path):
+    # Identifies the CSV a columnar copy was converted from
+    st = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def _stamp_path(path):
+    return path + '.source.json'
+
+def convert_to_store(fmt='parquet', compression='zstd'):
+    """Convert data/*.csv once into the columnar store.
+
+    Parquet is written with `compression`; Arrow IPC is written uncompressed so
+    that it can be memory-mapped. The CSVs are streamed, never fully loaded.
+    Next to every copy the path, size and mtime of its CSV are recorded, so a
+    copy is only read while the CSV is unchanged.
+
+    Returns:
+        list: Paths that were written
+    """
+    os.makedirs(PATHS.store_dir, exist_ok=True)
+    written = []
+    for csv_path in (PATHS.train_path, PATHS.test_path, PATHS.sub_path):
+        if not os.path.exists(csv_path):
+            continue
+        out = store_path(csv_path, fmt)
+        stamp = _source_stamp(csv_path)
+        if fmt == 'ipc':
+            pl.scan_csv(csv_path).sink_ipc(out, compression=None)
+        else:
+            pl.scan_csv(csv_path).sink_parquet(out, compression=compression)
+        with open(_stamp_path(out), 'w') as f:
+            json.dump(stamp, f)
+        written.append(out)
+    return written
+
+def _is_current(path, csv_path):
+    try:
+        with open(_stamp_path(path)) as f:
+            return json.load(f) == _source_stamp(csv_path)
+    except (OSError, ValueError):
+        return False
+
+def _resolve(csv_path):
+    # Prefer the columnar copy when convert_to_store has been run on this CSV and it has not changed since
+    # (or the CSV is gone)
+    for fmt in ('ipc', 'parquet'):
+        path = store_path(csv_path, fmt)
+        if os.path.exists(path) and (not os.path.exists(csv_path) or _is_current(path, csv_path)):
+            return path
+    return csv_path
+
+def scan(path, columns=None):
+    """Lazy scan of a CSV, Parquet or Arrow IPC file with optional column projection."""
+    path = _resolve(path) if path.endswith('.csv') else path
+    if path.endswith('.parquet'):
+        lf = pl.scan_parquet(path)
+    elif path.endswith('.arrow'):
+        lf = pl.scan_ipc(path)
+    else:
+        lf = pl.scan_csv(path)
+    return lf.select(columns) if columns else lf
+
+def scan_train(columns=None):
+    return scan(PATHS.train_path, columns)
+
+def scan_test(columns=None):
+    return scan(PATHS.test_path, columns)
+
+def _rebatch(frames, batch_size):
+    # Re-slice frames of any size into frames of exactly batch_size rows (the last may be shorter)
+    buffer, buffered = [], 0
+    for frame in frames:
+        buffer.append(frame)
+        buffered += frame.height
+        if buffered < batch_size:
+            continue
+        frame = pl.concat(buffer, rechunk=False)
+        offset = 0
+        while frame.height - offset >= batch_size:
+            yield frame.slice(offset, batch_size)
+            offset += batch_size
+        buffer = [frame.slice(offset)] if offset < frame.height else []
+        buffered = frame.height - offset
+    if buffered:
+        yield pl.concat(buffer)
+
+def iter_batches(path, batch_size=10_000, columns=None):
+    """Stream a CSV, Parquet or Arrow IPC file as Polars DataFrames of batch_size rows.
+
+    Only one batch (plus the reader's own buffer) is held in memory at a time, so
+    the feature pipeline can start on the first batch right away.
+    """
+    path = _resolve(path) if path.endswith('.csv') else path
+    if path.endswith('.parquet'):
+        frames = (pl.from_arrow(b) for b in
+                  pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns))
+    elif path.endswith('.arrow'):
+        frames = _iter_ipc(path, batch_size, columns)
+    else:
+        frames = _iter_csv(path, batch_size, columns)
+    yield from _rebatch(frames, batch_size)
+
+def _iter_ipc(path, batch_size, columns):
+    # Slices of a memory-mapped IPC file are zero-copy
+    lf = scan(path, columns)
+    offset = 0
+    while True:
+        frame = lf.slice(offset, batch_size).collect()
+        if not frame.height:
+            return
+        yield frame
+        offset += batch_size
+
+def _iter_csv(path, batch_size, columns):
+    # Streaming engine reads the CSV in chunks; read_csv_batched is gone in Polars 2.0
+    lf = pl.scan_csv(path)
+    lf = lf.select(columns) if columns else lf
+    yield from lf.collect_batches(chunk_size=batch_size, engine='streaming')
+
+def iter_train_batches(batch_size=10_000, columns=None):
+    return iter_batches(PATHS.train_path, batch_size, columns)
+
+def iter_test_batches(batch_size=10_000, columns=None):
+    return iter_batches(PATHS.test_path, batch_size, columns)
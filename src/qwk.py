@@ -0,0 +1,239 @@
+"""Vectorized quadratic weighted kappa for the fixed 1-6 score range.
+
+The confusion matrix comes from a single np.bincount and the quadratic weight
+matrix is computed once, instead of rebuilding label encoders and the confusion
+matrix in sklearn.cohen_kappa_score on every boosting iteration. The LightGBM
+objective and metric keep their label arrays and work buffers between calls,
+and optimize_thresholds turns regression outputs into class labels by searching
+all candidate cut points of a boundary at once.
+
+Note: cohen_kappa_score weighs by the position among the labels that actually
+occur; here the weights always span the full 1-6 range, as in the competition
+metric. The two agree whenever all six scores occur.
+
+Run `python qwk.py` for a benchmark against the sklearn path.
+"""
+
+import weakref
+
+import numpy as np
+
+# The model is trained on score - QWK_A (idea from https://www.kaggle.com/code/rsakata/optimize-qwk-by-lgb/notebook#QWK-objective)
+QWK_A = 2.948
+QWK_B = 1.092
+MIN_SCORE = 1
+MAX_SCORE = 6
+N_LABELS = MAX_SCORE - MIN_SCORE + 1
+
+_labels = np.arange(N_LABELS)
+WEIGHTS = (_labels[:, None] - _labels[None, :]) ** 2 / (N_LABELS - 1) ** 2
+
+
+def confusion_matrix(y_true, y_pred):
+    """N_LABELS x N_LABELS confusion counts of integer scores in [MIN_SCORE, MAX_SCORE]."""
+    index = (np.asarray(y_true, dtype=np.intp) - MIN_SCORE) * N_LABELS + (np.asarray(y_pred, dtype=np.intp) - MIN_SCORE)
+    return np.bincount(index, minlength=N_LABELS * N_LABELS).reshape(N_LABELS, N_LABELS)
+
+def kappa_from_confusion(O):
+    """Quadratic weighted kappa of one confusion matrix or a stack (..., N_LABELS, N_LABELS)."""
+    O = np.asarray(O, dtype=np.float64)
+    n = O.sum(axis=(-2, -1))
+    expected = O.sum(axis=-1)[..., :, None] * O.sum(axis=-2)[..., None, :] / n[..., None, None]
+    return 1 - (WEIGHTS * O).sum(axis=(-2, -1)) / (WEIGHTS * expected).sum(axis=(-2, -1))
+
+def quadratic_weighted_kappa(y_true, y_pred):
+    """QWK of integer scores."""
+    return float(kappa_from_confusion(confusion_matrix(y_true, y_pred)))
+
+def to_scores(preds, offset=0.0):
+    """Round regression outputs (plus offset) to integer scores in range."""
+    return np.clip(np.rint(np.asarray(preds) + offset), MIN_SCORE, MAX_SCORE).astype(np.intp)
+
+
+class QWKObjective:
+    """LightGBM custom objective for labels stored as score - QWK_A.
+
+    Labels and the work buffers are allocated on the first call for a Dataset
+    and reused afterwards, so an iteration only does in-place array arithmetic.
+    """
+
+    def __init__(self, a=QWK_A, b=QWK_B):
+        self.a = a
+        self.b = b
+        self._data = None
+
+    def _label(self, train_data):
+        return train_data.get_label()
+
+    def _prepare(self, train_data):
+        labels = np.asarray(self._label(train_data), dtype=np.float64) + self.a
+        n = len(labels)
+        # A weak reference, so the objective does not keep the Dataset alive
+        self._data = weakref.ref(train_data)
+        self._labels = labels
+        self._p = np.empty(n)
+        self._d = np.empty(n)
+        self._grad = np.empty(n)
+        self._hess = np.ones(n)
+
+    def __call__(self, y_pred, train_data):
+        if self._data is None or self._data() is not train_data:
+            self._prepare(train_data)
+        p, d, grad = self._p, self._d, self._grad
+        n = len(p)
+        # preds = clip(y_pred + a, 1, 6)
+        np.add(y_pred, self.a, out=p)
+        np.clip(p, MIN_SCORE, MAX_SCORE, out=p)
+        # f = 1/2 * sum((preds - labels)^2), df = preds - labels
+        np.subtract(p, self._labels, out=d)
+        f = 0.5 * np.dot(d, d)
+        # g = 1/2 * sum((preds - a)^2 + b), dg = preds - a
+        np.subtract(p, self.a, out=p)
+        g = 0.5 * (np.dot(p, p) + self.b * n)
+        # grad = (df/g - f*dg/g^2) * n
+        np.multiply(d, n / g, out=grad)
+        np.multiply(p, f * n / g ** 2, out=p)
+        np.subtract(grad, p, out=grad)
+        return grad, self._hess
+
+
+class QWKMetric:
+    """LightGBM feval returning ('QWK', kappa, True); integer labels are cached per Dataset.
+
+    The cache matches Datasets with `is` through weak references: a freed
+    Dataset's id cannot be reused to look up stale labels, and the metric does
+    not keep the Datasets it has seen alive.
+    """
+
+    def __init__(self, a=QWK_A):
+        self.a = a
+        self._labels = []
+
+    def _label(self, eval_data):
+        return eval_data.get_label()
+
+    def _scores(self, eval_data):
+        # Drop the entries of freed Datasets
+        self._labels = [(ref, labels) for ref, labels in self._labels if ref() is not None]
+        for ref, labels in self._labels:
+            if ref() is eval_data:
+                return labels
+        labels = to_scores(self._label(eval_data), self.a)
+        self._labels.append((weakref.ref(eval_data), labels))
+        return labels
+
+    def __call__(self, y_pred, eval_data):
+        return 'QWK', quadratic_weighted_kappa(self._scores(eval_data), to_scores(y_pred, self.a)), True
+
+
+class SklearnQWKObjective(QWKObjective):
+    """QWKObjective with the LGBMModel calling order (y_true, y_pred), as the notebook's qwk_obj.
+
+    The buffers are kept per label array instead of per Dataset.
+    """
+
+    def _label(self, y_true):
+        return y_true
+
+    def __call__(self, y_true, y_pred):
+        return super().__call__(y_pred, y_true)
+
+
+class SklearnQWKMetric(QWKMetric):
+    """QWKMetric with the LGBMModel calling order (y_true, y_pred), as the notebook's quadratic_weighted_kappa."""
+
+    def _label(self, y_true):
+        return y_true
+
+    def __call__(self, y_true, y_pred):
+        return super().__call__(y_pred, y_true)
+
+
+def apply_thresholds(preds, thresholds):
+    """Scores from regression outputs: MIN_SCORE + number of thresholds <= pred."""
+    return MIN_SCORE + np.searchsorted(thresholds, preds, side='right')
+
+def optimize_thresholds(y_true, preds, n_candidates=101, n_rounds=3):
+    """Coordinate search of the N_LABELS - 1 cut points that maximize QWK.
+
+    For one boundary only the rows currently labelled on either side of it can
+    change, so the confusion matrices of all candidate cut points are built at
+    once from per-label cumulative counts and scored as one stack.
+
+    Args:
+        y_true (_type_): Integer scores.
+        preds (_type_): Regression outputs on the score scale.
+        n_candidates (int): Cut points tried per boundary and round.
+        n_rounds (int): Passes over all boundaries.
+
+    Returns:
+        thresholds: np.ndarray of N_LABELS - 1 increasing cut points
+        qwk: float, QWK of apply_thresholds(preds, thresholds)
+    """
+    t = np.asarray(y_true, dtype=np.intp) - MIN_SCORE
+    preds = np.asarray(preds, dtype=np.float64)
+    thresholds = np.arange(MIN_SCORE, MAX_SCORE, dtype=np.float64) + 0.5
+    for _ in range(n_rounds):
+        for k in range(N_LABELS - 1):
+            lo = thresholds[k - 1] if k > 0 else min(preds.min(), thresholds[k])
+            hi = thresholds[k + 1] if k < N_LABELS - 2 else max(np.nextafter(preds.max(), np.inf), thresholds[k])
+            candidates = np.linspace(lo, hi, n_candidates)
+            labels = np.searchsorted(thresholds, preds, side='right')
+            region = (labels == k) | (labels == k + 1)
+            base = confusion_matrix(t[~region] + MIN_SCORE, labels[~region] + MIN_SCORE)
+            # below[l, c]: rows of true label l in the region with pred < candidates[c]
+            rt, rp = t[region], preds[region]
+            below = np.zeros((N_LABELS, n_candidates))
+            totals = np.bincount(rt, minlength=N_LABELS)
+            for label in np.flatnonzero(totals):
+                below[label] = np.searchsorted(np.sort(rp[rt == label]), candidates, side='left')
+            O = np.repeat(base[None].astype(np.float64), n_candidates, axis=0)
+            O[:, :, k] += below.T
+            O[:, :, k + 1] += (totals[:, None] - below).T
+            thresholds[k] = candidates[int(np.argmax(kappa_from_confusion(O)))]
+    return thresholds, quadratic_weighted_kappa(y_true, apply_thresholds(preds, thresholds))
+
+
+def benchmark(n=20_000, repeat=50, seed=0):
+    """Time the metric and objective against the sklearn / notebook implementations."""
+    from timeit import timeit
+    from sklearn.metrics import cohen_kappa_score
+
+    class _Data:
+        def __init__(self, label):
+            self.label = label
+        def get_label(self):
+            return self.label
+
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(MIN_SCORE, MAX_SCORE + 1, n)
+    preds = np.clip(y_true + rng.normal(0, 0.8, n), 0.5, 6.5)
+    y_pred = to_scores(preds)
+    data = _Data(y_true - QWK_A)
+    raw = preds - QWK_A
+
+    def notebook_obj():
+        labels = data.get_label() + QWK_A
+        p = (raw + QWK_A).clip(1, 6)
+        f = 1/2*np.sum((p-labels)**2)
+        g = 1/2*np.sum((p-QWK_A)**2+QWK_B)
+        grad = ((p - labels)/g - f*(p - QWK_A)/g**2)*len(labels)
+        return grad, np.ones(len(labels))
+
+    objective, metric = QWKObjective(), QWKMetric()
+    assert np.allclose(objective(raw, data)[0], notebook_obj()[0])
+    assert np.isclose(quadratic_weighted_kappa(y_true, y_pred), cohen_kappa_score(y_true, y_pred, weights='quadratic'))
+    results = {
+        'kappa sklearn': timeit(lambda: cohen_kappa_score(y_true, y_pred, weights='quadratic'), number=repeat),
+        'kappa bincount': timeit(lambda: quadratic_weighted_kappa(y_true, y_pred), number=repeat),
+        'metric (lgb feval)': timeit(lambda: metric(raw, data), number=repeat),
+        'objective notebook': timeit(notebook_obj, number=repeat),
+        'objective in-place': timeit(lambda: objective(raw, data), number=repeat),
+        'optimize_thresholds': timeit(lambda: optimize_thresholds(y_true, preds), number=1) * repeat,
+    }
+    for name, seconds in results.items():
+        print(f"{name:<22} {seconds / repeat * 1e3:9.3f} ms/call")
+    return results
+
+if __name__ == '__main__':
+    benchmark()
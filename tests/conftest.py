@@ -0,0 +1,40 @@
+import os
+import sys
+
+import polars as pl
+import pytest
+
+# The modules in src/ import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from Synthetic_essays import generate_essays  # noqa: E402
+
+# Texts that hit the normalizer rules the synthetic essays rarely touch
+EDGE_TEXTS = [
+    "Hello   <b>World</b>!! Visit http://example.com or https://x.org/a?b=1 now...",
+    "@user said it's 10 o'clock,,, and I'm late.... You'll see '99 numbers 123abc",
+    "  Leading and trailing whitespace\t\n\nSecond paragraph. Short. This sentence is long enough to count.  ",
+    "They can't've known y'all'd've come; she'd've, wouldn't've... DON'T Don't don't",
+    "One paragraph without any period at all but with several words in it",
+    "Commas,,,,and periods....mixed.,.,together\n\n\n\nafter an empty paragraph",
+]
+
+
+@pytest.fixture(scope='session')
+def essays():
+    """Polars frame of synthetic essays plus EDGE_TEXTS, with 'essay_id' and 'full_text'."""
+    synthetic = generate_essays(40, seed=0).select('essay_id', 'full_text')
+    edge = pl.DataFrame({'essay_id': [f'edge{i}' for i in range(len(EDGE_TEXTS))], 'full_text': EDGE_TEXTS})
+    return pl.concat([synthetic, edge])
+
+
+def nltk_data_available():
+    """True when the NLTK stopwords and punkt data used by Preprocessor are installed."""
+    try:
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        stopwords.words('english')
+        word_tokenize('Data check.')
+    except LookupError:
+        return False
+    return True
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from artifacts import ARTIFACT_VERSION, load_artifact, load_model, save_artifact
+from qwk import QWK_A, QWK_B, SklearnQWKMetric, SklearnQWKObjective, quadratic_weighted_kappa, to_scores
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'lgbm_model.pkl')
+
+
+def regression_data(seed=0, n=300, n_features=8):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    scores = np.clip(np.rint(3.5 + X[:, 0] + 0.5 * rng.normal(size=n)), 1, 6)
+    return X, scores - QWK_A
+
+
+def test_load_model_resolves_notebook_functions():
+    model = load_model(MODEL_PATH)
+    other = load_model(MODEL_PATH)
+    assert isinstance(model.objective, SklearnQWKObjective)
+    # Every load gets its own objective instance
+    assert model.objective is not other.objective
+    assert model.predict(np.zeros((2, model.n_features_in_))).shape == (2,)
+
+
+@pytest.mark.filterwarnings("ignore:The argument 'eval_set' is deprecated")
+def test_loaded_model_refits():
+    X, y = regression_data()
+    X_valid, y_valid = regression_data(1)
+    model = load_model(MODEL_PATH).set_params(n_estimators=5)
+    # eval_set, as in the notebook; newer LightGBM deprecates it in favour of eval_X/eval_y
+    model.fit(X, y, eval_set=[(X_valid, y_valid)], eval_metric=SklearnQWKMetric())
+    assert model.n_features_in_ == X.shape[1]
+    qwk = model.evals_result_['valid_0']['QWK']
+    assert len(qwk) == 5
+    expected = quadratic_weighted_kappa(to_scores(y_valid, QWK_A), to_scores(model.predict(X_valid), QWK_A))
+    assert qwk[-1] == pytest.approx(expected)
+
+
+def test_sklearn_adapters_match_notebook():
+    X, y = regression_data(1)
+    y_pred = X[:, 0] + 0.1 * X[:, 1]
+    # The notebook's qwk_obj
+    labels = y + QWK_A
+    preds = (y_pred + QWK_A).clip(1, 6)
+    f = 1/2*np.sum((preds-labels)**2)
+    g = 1/2*np.sum((preds-QWK_A)**2+QWK_B)
+    expected = ((preds - labels)/g - f*(preds - QWK_A)/g**2)*len(labels)
+    objective = SklearnQWKObjective()
+    for _ in range(2):
+        grad, hess = objective(y, y_pred)
+        assert np.allclose(grad, expected, rtol=1e-12, atol=1e-12)
+        assert np.array_equal(hess, np.ones(len(y)))
+    name, value, higher_better = SklearnQWKMetric()(y, y_pred)
+    assert (name, higher_better) == ('QWK', True)
+    assert value == quadratic_weighted_kappa(np.rint(y + QWK_A), (y_pred + QWK_A).clip(1, 6).round())
+
+
+def test_artifact_round_trip(tmp_path):
+    path = str(tmp_path / 'artifact.pkl')
+    save_artifact({'a': [1, 2]}, path)
+    assert load_artifact(path) == {'a': [1, 2]}
+
+
+def test_artifact_version_mismatch(tmp_path, monkeypatch):
+    path = str(tmp_path / 'artifact.pkl')
+    save_artifact('x', path)
+    monkeypatch.setattr('artifacts.ARTIFACT_VERSION', ARTIFACT_VERSION + 1)
+    with pytest.raises(ValueError):
+        load_artifact(path)
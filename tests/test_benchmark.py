@@ -0,0 +1,39 @@
+from Benchmark import compare, meta_mismatch
+
+META = {'seed': 0, 'repeat': 3, 'processes': 3, 'cpu_count': 4, 'polars': '2.0.0'}
+
+
+def result(process_seconds, rss_growth=0):
+    return {'seconds': min(process_seconds), 'process_seconds': process_seconds, 'rss_growth_bytes': rss_growth}
+
+
+def output(meta=META, **results):
+    return {'meta': dict(meta), 'results': results}
+
+
+def test_meta_mismatch():
+    assert meta_mismatch(output(), output()) == []
+    assert meta_mismatch(output({**META, 'repeat': 1}), output()) == [('repeat', 3, 1)]
+    assert meta_mismatch(output(), {'results': {}})[0] == ('cpu_count', None, 4)
+
+
+def test_time_regressions_beyond_tolerance_and_noise():
+    baseline = output(case=result([1.0, 1.02, 1.01]))
+    assert compare(output(case=result([1.1, 1.12, 1.11])), baseline) == []
+    assert compare(output(case=result([1.3, 1.31, 1.32])), baseline) == [('case', 'seconds', 1.0, 1.3)]
+    # A noisy run widens the floor
+    assert compare(output(case=result([1.3, 1.7, 1.9])), baseline) == []
+    # Below time_floor seconds a relative change is noise
+    small = output(case=result([0.1, 0.1]))
+    assert compare(output(case=result([0.14, 0.14])), small) == []
+    assert compare(output(case=result([0.14, 0.14])), small, time_floor=0.01) == [('case', 'seconds', 0.1, 0.14)]
+
+
+def test_memory_regressions():
+    baseline = output(case=result([1.0], rss_growth=10 * 2**20), tiny=result([1.0], rss_growth=2**19))
+    current = output(case=result([1.0], rss_growth=12 * 2**20), tiny=result([1.0], rss_growth=2**20))
+    assert compare(current, baseline) == [('case', 'rss_growth_bytes', 10 * 2**20, 12 * 2**20)]
+
+
+def test_cases_missing_from_the_baseline_are_skipped():
+    assert compare(output(new=result([5.0])), output()) == []
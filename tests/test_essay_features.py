@@ -0,0 +1,53 @@
+import math
+
+import polars as pl
+import pytest
+
+from conftest import nltk_data_available
+from Essay_features import essay_features, paragraph_features, sentence_features, word_features
+from feature_engineering import dataPreprocessing
+from Feature_plan import Generate_text_features
+
+PREPROCESSOR_COLUMNS = [
+    'text_length', 'word_count', 'unique_word_count', 'sentence_count', 'paragraph_count', 'splling_err_num',
+]
+
+
+def assert_same_features(single, batch_row):
+    """single holds the non-null features of batch_row; the absent ones must be null there."""
+    for name, expected in batch_row.items():
+        if name == 'essay_id':
+            continue
+        if expected is None:
+            assert name not in single, name
+        elif math.isnan(expected):
+            assert math.isnan(single[name]), name
+        else:
+            assert single[name] == pytest.approx(expected, rel=1e-12, abs=1e-12), name
+
+
+def test_text_features_match_batch(essays):
+    batch = Generate_text_features(essays)
+    for full_text, row in zip(essays['full_text'], batch.iter_rows(named=True)):
+        text_norm = dataPreprocessing(full_text)
+        feats = {}
+        paragraph_features(full_text, feats)
+        sentence_features(text_norm, feats)
+        word_features(text_norm, feats)
+        assert_same_features(feats, row)
+        assert set(feats) <= set(batch.columns)
+
+
+@pytest.mark.skipif(not nltk_data_available(), reason='NLTK stopwords/punkt data not installed')
+def test_essay_features_match_batch(essays):
+    from Preprocessor import Preprocessor
+
+    preprocessor = Preprocessor()
+    pre = preprocessor.run(essays.to_pandas(), mode='test', verbose=False)
+    batch = Generate_text_features(essays).join(
+        pl.from_pandas(pre[['essay_id', *PREPROCESSOR_COLUMNS]]), on='essay_id', how='left')
+    texts = dict(zip(essays['essay_id'], essays['full_text']))
+    for row in batch.iter_rows(named=True):
+        feats = essay_features(texts[row['essay_id']], preprocessor.spell_cache)
+        assert_same_features(feats, row)
+        assert set(feats) == {name for name, value in row.items() if value is not None} - {'essay_id'}
@@ -0,0 +1,122 @@
+import random
+import re
+import string
+
+import pyarrow as pa
+import pytest
+
+from conftest import EDGE_TEXTS
+from feature_engineering import (
+    CONTRACTIONS, ContractionExpander, TextNormalizer, cList, dataPreprocessing, dataPreprocessing_w_contract,
+    dataPreprocessing_w_contract_punct_remove, dataPreprocessing_w_punct_remove, normalize_batch,
+)
+
+# Longest keys first: the alternation then matches leftmost-longest, like ContractionExpander
+_contractions_re = re.compile('(%s)' % '|'.join(sorted(cList, key=len, reverse=True)))
+
+
+def reference_preprocessing(x, contract=False, punct_remove=False):
+    # The original multi-pass dataPreprocessing* pipeline
+    x = x.lower()
+    x = re.sub(r'<.*?>', '', x)
+    x = re.sub(r"@\w+", '', x)
+    x = re.sub(r"'\d+", '', x)
+    x = re.sub(r"\d+", '', x)
+    x = re.sub(r"http\w+", '', x)
+    x = re.sub(r"\s+", " ", x)
+    if contract:
+        x = _contractions_re.sub(lambda m: cList[m.group(0)], x)
+    x = re.sub(r"\.+", ".", x)
+    x = re.sub(r"\,+", ",", x)
+    if punct_remove:
+        x = x.translate(str.maketrans('', '', string.punctuation))
+    return x.strip()
+
+
+VARIANTS = [
+    (dataPreprocessing, False, False),
+    (dataPreprocessing_w_contract, True, False),
+    (dataPreprocessing_w_punct_remove, False, True),
+    (dataPreprocessing_w_contract_punct_remove, True, True),
+]
+
+
+@pytest.mark.parametrize('func, contract, punct_remove', VARIANTS)
+def test_variants_match_reference(essays, func, contract, punct_remove):
+    for text in essays['full_text'].to_list():
+        assert func(text) == reference_preprocessing(text, contract, punct_remove)
+
+
+@pytest.mark.parametrize('func, contract, punct_remove', VARIANTS)
+def test_batch_matches_single(essays, func, contract, punct_remove):
+    texts = essays['full_text'].to_list()
+    expected = [func(text) for text in texts]
+    assert normalize_batch(texts, contract, punct_remove) == expected
+    assert normalize_batch(essays['full_text'], contract, punct_remove) == expected
+    assert normalize_batch(pa.chunked_array([texts[:10], texts[10:]]), contract, punct_remove) == expected
+
+
+def test_batch_passes_missing_values_through():
+    assert normalize_batch(['A  B', None]) == ['a b', None]
+
+
+def test_normalizer_rules():
+    normalize = TextNormalizer()
+    assert normalize(EDGE_TEXTS[0]) == "hello world!! visit http://example.com or ://x.org/a?b= now."
+    assert normalize("Wait,,, what.... '99 @bob 42") == "wait, what."
+
+
+# The original expandContractions: alternation in cList order, i.e. leftmost-first
+_original_re = re.compile('(%s)' % '|'.join(cList.keys()))
+
+
+def original_expand(text):
+    return _original_re.sub(lambda m: cList[m.group(0)], text)
+
+
+def longest_first_expand(text):
+    return _contractions_re.sub(lambda m: cList[m.group(0)], text)
+
+
+def random_texts(n, seed=0):
+    # Keys, pieces of keys and the characters they are made of, glued together at random
+    rng = random.Random(seed)
+    keys = list(cList)
+    pieces = keys + [k[:rng.randint(1, len(k))] for k in keys] + [k[rng.randint(0, len(k) - 1):] for k in keys]
+    pieces += list("' .,") + sorted(set(''.join(keys)))
+    return [''.join(rng.choice(pieces) for _ in range(rng.randint(0, 40))) for _ in range(n)]
+
+
+def test_expander_matches_original_regex(essays):
+    # Without stacked keys such as "can't've" leftmost-first and leftmost-longest agree
+    stacked = [k for k in cList if any(o != k and k.startswith(o) for o in cList)]
+    keys = [k for k in cList if k not in stacked and not any(o != k and o.startswith(k) for o in cList)]
+    rng = random.Random(0)
+    texts = [text for text in essays['full_text'] if not any(k in text for k in stacked)]
+    texts += [' '.join(rng.choice(keys + ['word', 'x.', "'", "o'clock"]) for _ in range(30)) for _ in range(200)]
+    for text in texts:
+        assert CONTRACTIONS(text) == original_expand(text)
+
+
+def test_expander_is_leftmost_longest():
+    for text in random_texts(2000):
+        assert CONTRACTIONS(text) == longest_first_expand(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("can't've", "cannot have"),
+    ("I can't, I won't", "I cannot, I will not"),
+    ("y'all'd've", "you all would have"),
+    ("how'd'y'all", "how do you'all"),
+    ("no apostrophe", "no apostrophe"),
+    ("''", "''"),
+    ("", ""),
+])
+def test_expander_cases(text, expected):
+    assert CONTRACTIONS(text) == expected
+
+
+def test_expander_requires_apostrophes():
+    with pytest.raises(ValueError):
+        ContractionExpander({'cant': 'cannot'})
+    assert ContractionExpander({"a'b": 'x'}).batch(["a'b", None]) == ['x', None]
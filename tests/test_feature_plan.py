@@ -0,0 +1,30 @@
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+from polars.testing import assert_frame_equal
+
+from Feature_plan import Generate_text_features
+from Paragraph_engineering import Paragraph_Eng, Paragraph_Preprocess
+from Sentence_engineering import Sentence_Eng, Sentence_Preprocess
+from Word_engineering import Word_Eng, Word_Preprocess
+
+
+def eager_features(essays):
+    # The notebook path: one eager pipeline per granularity, merged in pandas
+    paragraphs = essays.with_columns(pl.col('full_text').str.split(by='\n\n').alias('paragraph'))
+    feats = Paragraph_Eng(Paragraph_Preprocess(paragraphs, native=False))
+    feats = feats.merge(Sentence_Eng(Sentence_Preprocess(essays, native=False)), on='essay_id', how='left')
+    return feats.merge(Word_Eng(Word_Preprocess(essays)), on='essay_id', how='left')
+
+
+def test_fused_plan_matches_eager_features(essays):
+    fused = Generate_text_features(essays).to_pandas()
+    expected = eager_features(essays)
+    assert list(fused.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(fused, expected, check_dtype=False)
+
+
+def test_fused_plan_accepts_lazy_input_and_arrow_output(essays):
+    table = Generate_text_features(essays.lazy(), to_arrow=True)
+    assert isinstance(table, pa.Table)
+    assert_frame_equal(pl.from_arrow(table), Generate_text_features(essays))
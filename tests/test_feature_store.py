@@ -0,0 +1,61 @@
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from Feature_plan import Generate_text_features
+from Feature_store import FeatureStore
+
+
+class Counting:
+    """Generate_text_features that records how many essays it was asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, df):
+        self.calls.append(df.height)
+        return Generate_text_features(df)
+
+
+def expected_rows(data):
+    # Computed directly, in the order of data
+    return data.select('essay_id').join(Generate_text_features(data), on='essay_id', how='left', maintain_order='left')
+
+
+def test_rows_match_direct_computation(essays, tmp_path):
+    store = FeatureStore(str(tmp_path))
+    data = essays.reverse()
+    compute = Counting()
+    rows = store.get_or_compute('text', data, compute, funcs=(Generate_text_features,))
+    assert_frame_equal(rows, expected_rows(data))
+    assert compute.calls == [data.height]
+
+    # Everything is stored: the second run reads it back unchanged
+    assert_frame_equal(store.get_or_compute('text', data, compute, funcs=(Generate_text_features,)), rows)
+    assert compute.calls == [data.height]
+
+
+def test_incremental_runs_compute_only_new_texts(essays, tmp_path):
+    store = FeatureStore(str(tmp_path))
+    compute = Counting()
+    first, rest = essays.head(20), essays.tail(essays.height - 20)
+    store.get_or_compute('text', first, compute, funcs=(Generate_text_features,))
+
+    # Shuffled, with texts that are already stored (under other essay_ids) and repeated within the batch
+    copies = first.head(5).with_columns(pl.concat_str(pl.lit('copy_'), 'essay_id').alias('essay_id'))
+    repeats = rest.head(3).with_columns(pl.concat_str(pl.lit('repeat_'), 'essay_id').alias('essay_id'))
+    data = pl.concat([rest, copies, first, repeats]).sample(fraction=1.0, shuffle=True, seed=0)
+    rows = store.get_or_compute('text', data, compute, funcs=(Generate_text_features,))
+
+    assert compute.calls == [20, rest.height]
+    assert rows['essay_id'].to_list() == data['essay_id'].to_list()
+    assert_frame_equal(rows, expected_rows(data))
+
+
+def test_pandas_input_and_new_versions(essays, tmp_path):
+    store = FeatureStore(str(tmp_path))
+    compute = Counting()
+    rows = store.get_or_compute('text', essays.to_pandas(), compute, funcs=(Generate_text_features,))
+    assert_frame_equal(rows, expected_rows(essays))
+    # Another version of the same feature set does not reuse the stored rows
+    store.get_or_compute('text', essays, compute, funcs=(Generate_text_features,), version='2')
+    assert compute.calls == [essays.height, essays.height]
@@ -0,0 +1,120 @@
+from functools import partial
+
+import numpy as np
+import pytest
+from polars.testing import assert_frame_equal
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from feature_engineering import normalize_batch
+from Feature_plan import Generate_text_features
+from Feature_store import FeatureStore
+from Incremental_features import IncrementalFeatures, IncrementalTfidf
+from Vectorization import make_tfidf_vectorizer
+
+FIT = 20
+
+
+def word_vectorizer():
+    # Word_vectorizer's settings without the NLTK stopword list
+    return TfidfVectorizer(strip_accents='ascii', ngram_range=(1, 1), min_df=0.05, max_df=0.95, sublinear_tf=True)
+
+
+def assert_same_rows(block, expected):
+    assert block.matrix.shape == expected.shape
+    np.testing.assert_allclose(block.matrix.toarray(), expected.toarray(), rtol=1e-12, atol=1e-12)
+
+
+def refit(vectorizer, texts):
+    # The fitted vocabulary with the IDF of texts: what the running document frequencies converge to
+    return clone(vectorizer).set_params(vocabulary=vectorizer.vocabulary_).fit(texts)
+
+
+def test_rows_match_the_vectorizer_without_drift(essays):
+    texts = essays['full_text'].to_list()
+    ids = essays['essay_id'].to_numpy()
+    vectorizer = make_tfidf_vectorizer().fit(texts[:FIT])
+    view = IncrementalTfidf(vectorizer, tolerance=np.inf)
+    for start, stop in [(0, 7), (7, 8), (8, len(texts))]:
+        block, stale = view.append(ids[start:stop], texts[start:stop])
+        assert_same_rows(block, vectorizer.transform(texts[start:stop]))
+        assert block.columns == [f'tfid_{i}' for i in range(len(vectorizer.vocabulary_))]
+        assert block.essay_id.tolist() == ids[start:stop].tolist()
+        assert stale.size == 0
+    assert_same_rows(view.transform(), vectorizer.transform(texts))
+    assert_same_rows(view.transform(ids[::-3]), vectorizer.transform(texts[::-3]))
+
+
+def test_preprocessed_rows_match_the_vectorizer(essays):
+    texts = essays['full_text'].to_list()
+    preprocess = partial(normalize_batch, contract=True, punct_remove=True)
+    vectorizer = word_vectorizer().fit(preprocess(texts))
+    view = IncrementalTfidf(vectorizer, 'tfid_w_', preprocess=preprocess, tolerance=np.inf)
+    block, _ = view.append(essays['essay_id'].to_numpy(), texts)
+    assert_same_rows(block, vectorizer.transform(preprocess(texts)))
+    assert block.columns[0] == 'tfid_w_0'
+
+
+def expected_stale(vectorizer, before, after, texts, ids, tolerance):
+    # Earlier essays that use a column whose IDF moved past the tolerance
+    changed = np.abs(after - before) / before > tolerance
+    counts = CountVectorizer.transform(vectorizer, texts)
+    return sorted(ids[np.flatnonzero(counts @ changed.astype(float))].tolist())
+
+
+def test_refresh_reports_the_stale_rows(essays):
+    texts = essays['full_text'].to_list()
+    ids = essays['essay_id'].to_numpy()
+    vectorizer = word_vectorizer().fit(texts[:FIT])
+    view = IncrementalTfidf(vectorizer, 'tfid_w_', tolerance=0.05)
+
+    # The fitted corpus itself does not move the IDF
+    _, stale = view.append(ids[:FIT], texts[:FIT])
+    assert stale.size == 0 and view.drift() == pytest.approx(0, abs=1e-12)
+
+    # One essay of the two rarest words only moves their columns past the tolerance
+    terms = vectorizer.get_feature_names_out()
+    rare = ' '.join(terms[np.argsort(vectorizer.idf_)[-2:]])
+    _, stale = view.append(['rare'], [rare])
+    current = refit(vectorizer, texts[:FIT] + [rare])
+    np.testing.assert_allclose(view.idf, current.idf_)
+    expected = expected_stale(vectorizer, vectorizer.idf_, current.idf_, texts[:FIT], ids[:FIT], 0.05)
+    assert 0 < len(expected) < FIT and sorted(stale.tolist()) == expected
+
+    # The rest of the corpus moves most columns; stale rows are re-read with the refreshed weights
+    block, stale = view.append(ids[FIT:], texts[FIT:])
+    after = refit(vectorizer, texts[:FIT] + [rare] + texts[FIT:])
+    earlier = np.append(ids[:FIT], 'rare')
+    assert sorted(stale.tolist()) == expected_stale(vectorizer, current.idf_, after.idf_, texts[:FIT] + [rare],
+                                                    earlier, 0.05)
+    assert_same_rows(block, after.transform(texts[FIT:]))
+    position = {i: k for k, i in enumerate(earlier.tolist())}
+    assert_same_rows(view.transform(stale), after.transform([(texts[:FIT] + [rare])[position[i]] for i in stale]))
+    assert view.drift() == 0
+
+
+def test_appending_an_essay_twice_fails(essays):
+    texts = essays['full_text'].to_list()
+    view = IncrementalTfidf(make_tfidf_vectorizer().fit(texts))
+    view.append(['a', 'b'], texts[:2])
+    with pytest.raises(ValueError):
+        view.append(['c', 'a'], texts[2:4])
+    with pytest.raises(ValueError):
+        view.append(['d', 'd'], texts[2:4])
+    assert view.n_docs == 2
+
+
+def test_incremental_features_match_batch(essays, tmp_path):
+    texts = essays['full_text'].to_list()
+    vectorizer = make_tfidf_vectorizer().fit(texts)
+    words = word_vectorizer().fit(normalize_batch(texts, contract=True, punct_remove=True))
+    state = IncrementalFeatures(vectorizer, words, store=FeatureStore(str(tmp_path)), tolerance=np.inf)
+    for data in (essays.head(FIT), essays.tail(essays.height - FIT).reverse()):
+        feats, blocks, stale = state.append(data)
+        expected = data.select('essay_id').join(Generate_text_features(data), on='essay_id', how='left',
+                                                maintain_order='left')
+        assert_frame_equal(feats, expected)
+        assert_same_rows(blocks[0], vectorizer.transform(data['full_text'].to_list()))
+        assert_same_rows(blocks[1], words.transform(normalize_batch(data['full_text'], contract=True,
+                                                                    punct_remove=True)))
+        assert stale == []
@@ -0,0 +1,41 @@
+import pytest
+from polars.testing import assert_frame_equal
+
+import Instrumentation
+from Feature_plan import Generate_text_features
+
+
+@pytest.fixture
+def profiling():
+    Instrumentation.reset()
+    Instrumentation.enable()
+    yield
+    Instrumentation.disable()
+    Instrumentation.reset()
+
+
+def test_profiled_plan_matches_fused_plan(essays, profiling):
+    profiled = Generate_text_features(essays)
+    stats = Instrumentation.report()
+    Instrumentation.disable()
+    assert_frame_equal(profiled, Generate_text_features(essays))
+    for name in ('Generate_text_features', 'Feature_plan.normalize', 'Feature_plan.paragraph',
+                 'Feature_plan.sentence', 'Feature_plan.word'):
+        assert stats[name]['calls'] == 1, name
+    # The streaming engine may hand the batch UDF several chunks
+    assert stats['normalize_batch']['calls'] >= 1
+    assert stats['Generate_text_features']['rows_in'] == essays.height
+    assert stats['Generate_text_features']['rows_out'] == essays.height
+
+
+def test_drain_and_merge(profiling):
+    with Instrumentation.measure('stage', rows_in=3) as m:
+        m.rows_out = 2
+    worker = Instrumentation.drain()
+    assert Instrumentation.report() == {}
+    Instrumentation.merge(worker)
+    Instrumentation.merge(worker)
+    merged = Instrumentation.report()['stage']
+    assert (merged['calls'], merged['rows_in'], merged['rows_out']) == (2, 6, 4)
+    assert merged['seconds'] == pytest.approx(2 * worker['stage']['seconds'])
+    assert merged['max_seconds'] == worker['stage']['max_seconds']
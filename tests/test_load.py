@@ -0,0 +1,58 @@
+import os
+
+import polars as pl
+import pytest
+
+import load
+from load import PATHS, convert_to_store, iter_batches, scan
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch, essays):
+    """PATHS pointed at a temporary data directory holding essays as train.csv."""
+    monkeypatch.setattr(PATHS, 'train_path', str(tmp_path / 'train.csv'))
+    monkeypatch.setattr(PATHS, 'test_path', str(tmp_path / 'test.csv'))
+    monkeypatch.setattr(PATHS, 'sub_path', str(tmp_path / 'sample_submission.csv'))
+    monkeypatch.setattr(PATHS, 'store_dir', str(tmp_path / 'store'))
+    essays.with_columns(pl.lit(3).alias('score')).write_csv(PATHS.train_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'ipc'])
+def test_store_is_used_until_the_csv_changes(data_dir, essays, fmt):
+    written = convert_to_store(fmt)
+    assert written == [load.store_path(PATHS.train_path, fmt)]
+    assert load._resolve(PATHS.train_path) == written[0]
+    assert scan(PATHS.train_path, ['essay_id']).collect().equals(pl.read_csv(PATHS.train_path, columns=['essay_id']))
+
+    # Replacing the CSV makes the copy stale: the CSV is read again
+    essays.head(5).with_columns(pl.lit(4).alias('score')).write_csv(PATHS.train_path)
+    os.utime(PATHS.train_path, ns=(1, 1))
+    assert load._resolve(PATHS.train_path) == PATHS.train_path
+    replaced = pl.read_csv(PATHS.train_path)
+    assert scan(PATHS.train_path, ['essay_id', 'score']).collect().equals(replaced.select('essay_id', 'score'))
+    assert pl.concat(iter_batches(PATHS.train_path, 2, columns=['essay_id'])).equals(replaced.select('essay_id'))
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'ipc'])
+@pytest.mark.parametrize('batch_size', [1, 7, 46, 1000])
+def test_iter_batches_sizes_and_projection(data_dir, fmt, batch_size):
+    if fmt != 'csv':
+        convert_to_store(fmt)
+    assert load._resolve(PATHS.train_path) == (PATHS.train_path if fmt == 'csv' else load.store_path(PATHS.train_path, fmt))
+    expected = pl.read_csv(PATHS.train_path)
+    n = expected.height
+
+    for columns in (None, ['score', 'essay_id'], ['full_text']):
+        batches = list(load.iter_train_batches(batch_size, columns))
+        assert [b.height for b in batches] == [batch_size] * (n // batch_size) + ([n % batch_size] if n % batch_size else [])
+        projected = expected.select(columns) if columns else expected
+        assert all(b.columns == projected.columns for b in batches)
+        assert pl.concat(batches).equals(projected)
+
+
+def test_rebatch_regroups_uneven_frames():
+    frames = [pl.DataFrame({'a': range(start, stop)}) for start, stop in [(0, 3), (3, 3), (3, 10), (10, 11)]]
+    batches = list(load._rebatch(iter(frames), 4))
+    assert [b['a'].to_list() for b in batches] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10]]
+    assert list(load._rebatch(iter([]), 4)) == []
@@ -0,0 +1,29 @@
+import pytest
+from spellchecker import SpellChecker
+
+from feature_engineering import dataPreprocessing
+from Preprocessor import SpellingCache
+
+
+@pytest.fixture(scope='module')
+def spellchecker():
+    return SpellChecker()
+
+
+def texts(essays):
+    # Raw texts keep the case and punctuation SpellChecker lowercases or rejects; normalized ones are what run() sees
+    return essays['full_text'].to_list() + [dataPreprocessing(text) for text in essays['full_text']]
+
+
+@pytest.mark.parametrize('maxsize', [2**18, 4])
+def test_count_unknown_batch_matches_spellchecker(essays, spellchecker, maxsize):
+    cache = SpellingCache(spellchecker, maxsize=maxsize)
+    batch = texts(essays)
+    assert cache.count_unknown_batch(batch) == [len(spellchecker.unknown(text.split())) for text in batch]
+
+
+def test_unknown_matches_spellchecker(essays, spellchecker):
+    cache = SpellingCache(spellchecker)
+    for text in texts(essays):
+        assert cache.unknown(text.split()) == spellchecker.unknown(text.split())
+    assert cache.count_unknown_batch([]) == []
@@ -0,0 +1,104 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+from sklearn.metrics import cohen_kappa_score
+
+from qwk import (
+    MAX_SCORE, MIN_SCORE, QWK_A, QWK_B, QWKMetric, QWKObjective, apply_thresholds, confusion_matrix,
+    kappa_from_confusion, optimize_thresholds, quadratic_weighted_kappa, to_scores,
+)
+
+
+class Data:
+    """Stand-in for lgb.Dataset: only get_label is used."""
+    def __init__(self, label):
+        self.label = np.asarray(label, dtype=np.float64)
+
+    def get_label(self):
+        return self.label
+
+
+def sample(seed, n=2000, noise=0.8):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(MIN_SCORE, MAX_SCORE + 1, n)
+    preds = np.clip(y_true + rng.normal(0, noise, n), 0.5, 6.5)
+    return y_true, preds
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_kappa_matches_sklearn(seed):
+    y_true, preds = sample(seed, noise=0.5 + seed)
+    y_pred = to_scores(preds)
+    assert set(y_true) == set(y_pred) == set(range(MIN_SCORE, MAX_SCORE + 1))
+    expected = cohen_kappa_score(y_true, y_pred, weights='quadratic')
+    assert quadratic_weighted_kappa(y_true, y_pred) == pytest.approx(expected, rel=1e-12)
+
+
+def test_perfect_agreement():
+    y_true, _ = sample(0)
+    assert quadratic_weighted_kappa(y_true, y_true) == pytest.approx(1.0)
+
+
+def test_kappa_of_a_stack():
+    samples = [sample(seed) for seed in range(3)]
+    stack = np.stack([confusion_matrix(y_true, to_scores(preds)) for y_true, preds in samples])
+    assert np.allclose(kappa_from_confusion(stack), [kappa_from_confusion(O) for O in stack])
+
+
+def test_objective_matches_notebook():
+    objective = QWKObjective()
+    for seed in range(2):
+        y_true, preds = sample(seed)
+        data, raw = Data(y_true - QWK_A), preds - QWK_A
+        # The notebook's qwk_obj
+        labels = data.get_label() + QWK_A
+        p = (raw + QWK_A).clip(1, 6)
+        f = 1/2*np.sum((p-labels)**2)
+        g = 1/2*np.sum((p-QWK_A)**2+QWK_B)
+        expected = ((p - labels)/g - f*(p - QWK_A)/g**2)*len(labels)
+        grad, hess = objective(raw, data)
+        assert np.allclose(grad, expected, rtol=1e-12, atol=1e-12)
+        assert np.array_equal(hess, np.ones(len(labels)))
+
+
+def test_metric_keeps_labels_per_dataset():
+    metric = QWKMetric()
+    first_true, first_preds = sample(0)
+    second_true, second_preds = sample(1)
+    first, second = Data(first_true - QWK_A), Data(second_true - QWK_A)
+    for _ in range(2):
+        for data, y_true, preds in [(first, first_true, first_preds), (second, second_true, second_preds)]:
+            name, value, higher_better = metric(preds - QWK_A, data)
+            assert (name, higher_better) == ('QWK', True)
+            assert value == pytest.approx(quadratic_weighted_kappa(y_true, to_scores(preds)))
+
+
+def test_metric_does_not_reuse_labels_of_a_freed_dataset():
+    metric = QWKMetric()
+    for seed in range(20):
+        # A fresh Dataset may get the id of the one freed in the previous round
+        y_true, preds = sample(seed)
+        value = metric(preds - QWK_A, Data(y_true - QWK_A))[1]
+        assert value == pytest.approx(quadratic_weighted_kappa(y_true, to_scores(preds)))
+
+
+def test_callbacks_do_not_keep_datasets_alive():
+    objective, metric = QWKObjective(), QWKMetric()
+    y_true, preds = sample(0)
+    data = Data(y_true - QWK_A)
+    objective(preds - QWK_A, data)
+    metric(preds - QWK_A, data)
+    ref = weakref.ref(data)
+    del data
+    gc.collect()
+    assert ref() is None
+
+
+def test_optimize_thresholds():
+    y_true, preds = sample(0, noise=1.0)
+    thresholds, value = optimize_thresholds(y_true, preds)
+    assert np.all(np.diff(thresholds) > 0)
+    assert value == quadratic_weighted_kappa(y_true, apply_thresholds(preds, thresholds))
+    assert value >= quadratic_weighted_kappa(y_true, to_scores(preds))
@@ -0,0 +1,60 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from Scoring_service import MicroBatcher, make_server
+
+
+class LengthScorer:
+    """Scores an essay by its number of words; 'fail' anywhere in a batch raises."""
+
+    def score(self, texts):
+        if any('fail' in text for text in texts):
+            raise RuntimeError('model exploded')
+        return [len(text.split()) for text in texts]
+
+
+@pytest.fixture
+def url():
+    batcher = MicroBatcher(LengthScorer(), max_wait_ms=0.0)
+    server = make_server(batcher, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+def post(url, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(f'{url}/score', data=body, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_scores(url, essays):
+    texts = essays['full_text'].to_list()[:5]
+    assert post(url, {'essay_id': 'a', 'full_text': texts[0]}) == (200, {'essay_id': 'a', 'score': len(texts[0].split())})
+    status, scores = post(url, {'essays': [{'essay_id': i, 'full_text': t} for i, t in enumerate(texts)]})
+    assert status == 200
+    assert scores == [{'essay_id': i, 'score': len(t.split())} for i, t in enumerate(texts)]
+
+
+@pytest.mark.parametrize('payload', [b'not json', {'essay_id': 'a'}, {'full_text': 3}, {'essays': [{}]}, [1, 2]])
+def test_malformed_requests_are_400(url, payload):
+    status, reply = post(url, payload)
+    assert status == 400 and 'error' in reply
+
+
+def test_scoring_failures_are_500(url):
+    status, reply = post(url, {'full_text': 'this will fail'})
+    assert status == 500 and 'model exploded' in reply['error']
+    # The service keeps scoring afterwards
+    assert post(url, {'full_text': 'two words'}) == (200, {'essay_id': None, 'score': 2})
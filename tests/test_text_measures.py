@@ -0,0 +1,26 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from Paragraph_engineering import Paragraph_Preprocess
+from Sentence_engineering import Sentence_Preprocess
+
+
+def paragraphs(essays):
+    return essays.with_columns(pl.col('full_text').str.split(by='\n\n').alias('paragraph'))
+
+
+@pytest.mark.parametrize('preprocess, prepare', [
+    (Paragraph_Preprocess, paragraphs),
+    (Sentence_Preprocess, lambda essays: essays),
+])
+def test_native_matches_map_elements(essays, preprocess, prepare):
+    native = preprocess(prepare(essays), native=True)
+    reference = preprocess(prepare(essays), native=False)
+    assert_frame_equal(native, reference)
+
+
+def test_native_measures_are_lazy(essays):
+    lazy = Paragraph_Preprocess(paragraphs(essays).lazy())
+    assert isinstance(lazy, pl.LazyFrame)
+    assert_frame_equal(lazy.collect(), Paragraph_Preprocess(paragraphs(essays), native=False))